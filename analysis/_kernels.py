@@ -0,0 +1,145 @@
+"""
+数值计算内核模块
+安装了numba时以JIT编译执行，否则退化为普通Python函数
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+
+def channel_kernel(close, offsets, lengths, window, out_upper, out_lower, out_middle, out_middle_prev):
+    """批量计算各股票最新一天的通道线及倒数第10天的中轨
+
+    close为所有股票收盘价首尾相接的连续数组，offsets/lengths给出每只股票所在的区间；
+    数据不足一个窗口的股票保持输出为NaN
+    """
+    for s in prange(len(offsets)):
+        start = offsets[s]
+        end = start + lengths[s]
+
+        for k in range(2):
+            stop = end - 9 * k  # k=0: 最新一天，k=1: 倒数第10天
+            if stop - start < window:
+                break
+
+            total = 0.0
+            for i in range(stop - window, stop):
+                total += close[i]
+            mean = total / window
+
+            squares = 0.0
+            for i in range(stop - window, stop):
+                squares += (close[i] - mean) ** 2
+
+            if k == 0:
+                std = np.sqrt(squares / (window - 1))
+                out_middle[s] = mean
+                out_upper[s] = mean + std * 2
+                out_lower[s] = mean - std * 2
+            else:
+                out_middle_prev[s] = mean
+
+
+def volume_tail_means(volume):
+    """一次遍历最近20个值，同时得到近5日和近20日平均成交量（跳过NaN，与pandas mean一致）"""
+    n = len(volume)
+    sum_5 = sum_20 = 0.0
+    count_5 = count_20 = 0
+
+    for i in range(max(n - 20, 0), n):
+        value = volume[i]
+        if np.isnan(value):
+            continue
+        sum_20 += value
+        count_20 += 1
+        if i >= n - 5:
+            sum_5 += value
+            count_5 += 1
+
+    mean_5 = sum_5 / count_5 if count_5 > 0 else np.nan
+    mean_20 = sum_20 / count_20 if count_20 > 0 else np.nan
+    return mean_5, mean_20
+
+
+def resonance_score(close, ma5, ma20, volume, change_pct, amplitude):
+    """根据各列数组的最新值和近5/20日平均成交量计算共振评分"""
+    score = 0
+
+    # 价格趋势评分
+    if close[-1] > ma5[-1] > ma20[-1]:
+        score += 30
+
+    # 成交量评分
+    recent_volume, historical_volume = volume_tail_means(volume)
+    if recent_volume > historical_volume * 1.2:
+        score += 30
+
+    # 技术指标评分
+    if change_pct[-1] > 0:
+        score += 20
+
+    # 振幅评分
+    if amplitude[-1] > 3:
+        score += 20
+
+    return min(score, 100)
+
+
+def price_indicators(close, high, low, windows):
+    """一次遍历收盘价和高低价，同时计算多个窗口的滚动均值、涨跌幅和振幅
+
+    返回 (len(close), len(windows) + 2) 数组，前len(windows)列为各窗口均线，之后依次为涨跌幅和振幅（%）；
+    每个窗口维护滑动和与窗口内NaN个数，窗口未满或含NaN时均线为NaN（与pandas rolling(w).mean()一致）
+    """
+    n = len(close)
+    m = len(windows)
+    out = np.full((n, m + 2), np.nan)
+    sums = np.zeros(m)
+    nan_counts = np.zeros(m, dtype=np.int64)
+
+    for i in range(n):
+        value = close[i]
+        for j in range(m):
+            w = windows[j]
+            if np.isnan(value):
+                nan_counts[j] += 1
+            else:
+                sums[j] += value
+
+            if i >= w:
+                dropped = close[i - w]
+                if np.isnan(dropped):
+                    nan_counts[j] -= 1
+                else:
+                    sums[j] -= dropped
+
+            if i >= w - 1 and nan_counts[j] == 0:
+                out[i, j] = sums[j] / w
+
+        if i > 0:
+            prev_close = close[i - 1]
+            out[i, m] = (value / prev_close - 1) * 100
+            out[i, m + 1] = (high[i] - low[i]) / prev_close * 100
+
+    return out
+
+
+if njit is not None:
+    from numba import types
+
+    # pandas的to_numpy可能返回只读视图，签名使用只读数组类型（可写数组同样适用）
+    _f8_array = types.Array(types.float64, 1, 'A', readonly=True)
+
+    channel_kernel = njit(parallel=True, cache=True)(channel_kernel)
+    # 按签名预编译，避免首次调用时的编译延迟
+    volume_tail_means = njit(types.UniTuple(types.float64, 2)(_f8_array), cache=True)(volume_tail_means)
+    resonance_score = njit(types.int64(*[_f8_array] * 6), cache=True)(resonance_score)
+    price_indicators = njit(
+        types.float64[:, :](_f8_array, _f8_array, _f8_array, types.Array(types.int64, 1, 'A', readonly=True)),
+        cache=True
+    )(price_indicators)
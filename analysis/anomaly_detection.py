@@ -4,8 +4,10 @@
 
 import pandas as pd
 import numpy as np
+import concurrent.futures
 from datetime import datetime, timedelta
 from loguru import logger
+from core.app_config import Config
 from data.data_fetcher import data_fetcher
 
 
@@ -29,46 +31,47 @@ class AnomalyDetector:
                 }
             }
 
-            for stock_code in stock_codes:
-                try:
-                    # 获取实时数据
-                    realtime_data = self.data_fetcher.get_realtime_data([stock_code])
-
-                    if realtime_data.empty:
-                        continue
-
-                    # 获取历史数据用于对比
-                    end_date = datetime.now().strftime('%Y-%m-%d')
-                    start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-                    historical_data = self.data_fetcher.get_historical_data(stock_code, start_date, end_date)
+            # 每只股票的实时/历史数据请求互不依赖，在线程池中并发执行
+            histories = []
+            with concurrent.futures.ThreadPoolExecutor(max_workers=Config.ANOMALY_WORKERS) as executor:
+                future_to_code = {
+                    executor.submit(self._fetch_monitor_history, stock_code): stock_code
+                    for stock_code in stock_codes
+                }
 
-                    if historical_data.empty:
+                for future in concurrent.futures.as_completed(future_to_code):
+                    stock_code = future_to_code[future]
+                    try:
+                        historical_data = future.result()
+                    except Exception as e:
+                        logger.warning(f"监控股票 {stock_code} 异动失败: {e}")
                         continue
 
-                    # 检测各种异动
-                    price_anomalies = self.detect_price_anomaly(historical_data)
-                    volume_anomalies = self.detect_volume_anomaly(historical_data)
-                    turnover_anomalies = self.detect_turnover_anomaly(historical_data)
+                    if not historical_data.empty:
+                        histories.append(historical_data.assign(stock_code=stock_code))
 
-                    all_anomalies = price_anomalies + volume_anomalies + turnover_anomalies
+            # 所有股票的历史数据拼接后一次性检测各种异动
+            if histories:
+                detected = self._detect_anomalies_vectorized(pd.concat(histories, ignore_index=True))
+            else:
+                detected = {}
 
-                    if all_anomalies:
-                        anomaly_results['anomalies'].extend([
-                            {
-                                'stock_code': stock_code,
-                                'anomaly': anomaly
-                            }
-                            for anomaly in all_anomalies
-                        ])
+            for stock_code, (price_anomalies, volume_anomalies, turnover_anomalies) in detected.items():
+                all_anomalies = price_anomalies + volume_anomalies + turnover_anomalies
 
-                        # 更新统计
-                        anomaly_results['summary']['price_anomalies'] += len(price_anomalies)
-                        anomaly_results['summary']['volume_anomalies'] += len(volume_anomalies)
-                        anomaly_results['summary']['turnover_anomalies'] += len(turnover_anomalies)
+                if all_anomalies:
+                    anomaly_results['anomalies'].extend([
+                        {
+                            'stock_code': stock_code,
+                            'anomaly': anomaly
+                        }
+                        for anomaly in all_anomalies
+                    ])
 
-                except Exception as e:
-                    logger.warning(f"监控股票 {stock_code} 异动失败: {e}")
-                    continue
+                    # 更新统计
+                    anomaly_results['summary']['price_anomalies'] += len(price_anomalies)
+                    anomaly_results['summary']['volume_anomalies'] += len(volume_anomalies)
+                    anomaly_results['summary']['turnover_anomalies'] += len(turnover_anomalies)
 
             logger.info(f"异动监控完成，共发现 {len(anomaly_results['anomalies'])} 个异动")
             return anomaly_results
@@ -81,83 +84,120 @@ class AnomalyDetector:
                 'total_monitored': 0
             }
 
-    def detect_price_anomaly(self, data):
-        """检测价格异动"""
-        if data.empty or len(data) < 5:
-            return []
-
-        anomalies = []
-        latest = data.iloc[-1]
-
-        # 涨跌幅异动
-        change_pct = latest.get('change_pct', 0)
-        if abs(change_pct) > 7:  # 涨跌幅超过7%
-            anomalies.append({
+    def _fetch_monitor_history(self, stock_code):
+        """获取用于异动检测的近30天历史数据，无实时行情时返回空DataFrame"""
+        # 获取实时数据
+        realtime_data = self.data_fetcher.get_realtime_data([stock_code])
+
+        if realtime_data.empty:
+            return pd.DataFrame()
+
+        # 获取历史数据用于对比
+        end_date = Config.date_strings()[1]
+        start_date = Config.date_strings(30)[1]
+        return self.data_fetcher.get_historical_data(stock_code, start_date, end_date)
+
+    def _detect_anomalies_vectorized(self, data):
+        """对多只股票拼接的历史数据（组内按日期排序）一次性检测异动
+
+        返回 {stock_code: (价格异动, 成交量异动, 换手率异动)}
+        """
+        data = data.assign(volume=pd.to_numeric(data['volume'], errors='coerce'))
+        grouped = data.groupby('stock_code', sort=False)
+        counts = grouped.size()
+        latest = grouped.tail(1).set_index('stock_code').reindex(counts.index)
+
+        def latest_column(col):
+            if col not in latest.columns:
+                return pd.Series(0.0, index=counts.index)
+            return pd.to_numeric(latest[col], errors='coerce')
+
+        # 涨跌幅异动：涨跌幅超过7%
+        change_pct = latest_column('change_pct')
+        price_change_hit = (counts >= 5) & (change_pct.abs() > 7)
+
+        # 价格突破异动：偏离20日均线超过10%
+        if 'ma_20' in latest.columns:
+            ma20 = latest_column('ma_20')
+            deviation = (latest_column('close_price') - ma20) / ma20 * 100
+            deviation_hit = (counts >= 5) & (ma20 > 0) & (deviation.abs() > 10)
+        else:
+            deviation = pd.Series(np.nan, index=counts.index)
+            deviation_hit = pd.Series(False, index=counts.index)
+
+        # 成交量异动：近5日均量较近20日均量放大2倍以上
+        recent_avg_volume = grouped.tail(5).groupby('stock_code', sort=False)['volume'].mean()
+        historical_avg_volume = grouped.tail(20).groupby('stock_code', sort=False)['volume'].mean()
+        volume_ratio = recent_avg_volume / historical_avg_volume
+        volume_hit = (counts >= 10) & (historical_avg_volume > 0) & (volume_ratio > 2)
+
+        # 换手率异动：换手率超过15%
+        turnover_rate = latest_column('turnover_rate')
+        turnover_hit = turnover_rate > 15
+
+        results = {stock_code: ([], [], []) for stock_code in counts.index}
+
+        for stock_code in counts.index[price_change_hit.to_numpy()]:
+            value = float(change_pct[stock_code])
+            results[stock_code][0].append({
                 'type': 'price_change',
-                'description': f"价格异动：{'上涨' if change_pct > 0 else '下跌'}{abs(change_pct):.2f}%",
-                'value': change_pct,
-                'severity': 'high' if abs(change_pct) > 9 else 'medium'
+                'description': f"价格异动：{'上涨' if value > 0 else '下跌'}{abs(value):.2f}%",
+                'value': value,
+                'severity': 'high' if abs(value) > 9 else 'medium'
             })
 
-        # 价格突破异动
-        if 'ma_20' in latest:
-            ma20 = latest.get('ma_20', 0)
-            current_price = latest.get('close_price', 0)
-            if ma20 > 0:
-                deviation = (current_price - ma20) / ma20 * 100
-                if abs(deviation) > 10:  # 偏离20日均线超过10%
-                    anomalies.append({
-                        'type': 'price_deviation',
-                        'description': f"价格偏离20日均线{abs(deviation):.2f}%",
-                        'value': deviation,
-                        'severity': 'medium'
-                    })
-
-        return anomalies
+        for stock_code in counts.index[deviation_hit.to_numpy()]:
+            value = float(deviation[stock_code])
+            results[stock_code][0].append({
+                'type': 'price_deviation',
+                'description': f"价格偏离20日均线{abs(value):.2f}%",
+                'value': value,
+                'severity': 'medium'
+            })
 
-    def detect_volume_anomaly(self, data):
-        """检测成交量异动"""
-        if data.empty or len(data) < 10:
-            return []
+        for stock_code in counts.index[volume_hit.to_numpy()]:
+            value = float(volume_ratio[stock_code])
+            results[stock_code][1].append({
+                'type': 'volume_surge',
+                'description': f"成交量异动：较历史平均放大{value:.2f}倍",
+                'value': value,
+                'severity': 'high' if value > 5 else 'medium'
+            })
 
-        anomalies = []
-        latest = data.iloc[-1]
-
-        # 成交量异动
-        recent_avg_volume = data['volume'].tail(5).mean()
-        historical_avg_volume = data['volume'].tail(20).mean()
-
-        if historical_avg_volume > 0:
-            volume_ratio = recent_avg_volume / historical_avg_volume
-            if volume_ratio > 2:  # 成交量放大2倍以上
-                anomalies.append({
-                    'type': 'volume_surge',
-                    'description': f"成交量异动：较历史平均放大{volume_ratio:.2f}倍",
-                    'value': volume_ratio,
-                    'severity': 'high' if volume_ratio > 5 else 'medium'
-                })
+        for stock_code in counts.index[turnover_hit.to_numpy()]:
+            value = float(turnover_rate[stock_code])
+            results[stock_code][2].append({
+                'type': 'high_turnover',
+                'description': f"换手率异动：{value:.2f}%",
+                'value': value,
+                'severity': 'high' if value > 25 else 'medium'
+            })
 
-        return anomalies
+        return results
 
-    def detect_turnover_anomaly(self, data):
-        """检测换手率异动"""
+    def _detect_single_stock(self, data):
+        """检测单只股票的各类异动"""
         if data.empty:
-            return []
+            return [], [], []
+        results = self._detect_anomalies_vectorized(data.assign(stock_code=''))
+        return results['']
 
-        anomalies = []
-        latest = data.iloc[-1]
+    def detect_stock_anomalies(self, data):
+        """一次检测单只股票的全部异动，按价格、成交量、换手率顺序返回"""
+        price_anomalies, volume_anomalies, turnover_anomalies = self._detect_single_stock(data)
+        return price_anomalies + volume_anomalies + turnover_anomalies
 
-        # 换手率异动
-        turnover_rate = latest.get('turnover_rate', 0)
-        if turnover_rate > 15:  # 换手率超过15%
-            anomalies.append({
-                'type': 'high_turnover',
-                'description': f"换手率异动：{turnover_rate:.2f}%",
-                'value': turnover_rate,
-                'severity': 'high' if turnover_rate > 25 else 'medium'
-            })
+    def detect_price_anomaly(self, data):
+        """检测价格异动"""
+        return self._detect_single_stock(data)[0]
 
-        return anomalies
+    def detect_volume_anomaly(self, data):
+        """检测成交量异动"""
+        return self._detect_single_stock(data)[1]
+
+    def detect_turnover_anomaly(self, data):
+        """检测换手率异动"""
+        return self._detect_single_stock(data)[2]
 
     def detect_anomalies(self):
         """检测市场异动股票"""
@@ -4,15 +4,18 @@
 
 import pandas as pd
 import numpy as np
+import concurrent.futures
 from datetime import datetime, timedelta
 from loguru import logger
+from core.app_config import Config
+from analysis._kernels import channel_kernel
 
 
 class ChannelAnalyzer:
     """多空通道分析器"""
 
-    def __init__(self):
-        pass
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers  # 回退逐只获取数据时的并发线程数
 
     def perform_full_channel_analysis(self, stock_data):
         """执行完整的通道分析"""
@@ -33,7 +36,7 @@ class ChannelAnalyzer:
             trading_suggestions = self._generate_trading_suggestions(channel_data, channel_status)
 
             result = {
-                'analysis_date': datetime.now().strftime('%Y-%m-%d'),
+                'analysis_date': Config.date_strings()[1],
                 'data_period': f"{stock_data.iloc[0]['trade_date']} 至 {stock_data.iloc[-1]['trade_date']}",
                 'channel_info': {
                     'upper_line': channel_status['upper_line'],
@@ -57,33 +60,54 @@ class ChannelAnalyzer:
                 'channel_info': {}
             }
 
-    def _calculate_channel_lines(self, data):
-        """计算通道线"""
-        data = data.copy()
+    def _calculate_channel_lines(self, data, window=20):
+        """计算通道线，返回只包含收盘价和各通道线的新DataFrame（不复制输入数据）"""
+        close = data['close_price'].to_numpy(dtype=float)
 
-        # 计算移动平均线作为中轨
-        data['middle_line'] = data['close_price'].rolling(window=20).mean()
-
-        # 计算标准差
-        data['std'] = data['close_price'].rolling(window=20).std()
-
-        # 计算上轨和下轨（布林带方式）
-        data['upper_line'] = data['middle_line'] + (data['std'] * 2)
-        data['lower_line'] = data['middle_line'] - (data['std'] * 2)
+        # 计算移动平均线作为中轨，以及标准差（样本标准差，与pandas rolling一致）
+        if window == 20 and 'bb_middle' in data.columns and 'bb_std' in data.columns:
+            # 已由technical_analyzer计算过20日布林带时直接复用，不再重复遍历
+            middle_line = data['bb_middle'].to_numpy(dtype=float)
+            std = data['bb_std'].to_numpy(dtype=float)
+        else:
+            middle_line = np.full(len(close), np.nan)
+            std = np.full(len(close), np.nan)
+            if len(close) >= window:
+                windows = np.lib.stride_tricks.sliding_window_view(close, window)
+                middle_line[window - 1:] = windows.mean(axis=1)
+                std[window - 1:] = windows.std(axis=1, ddof=1)
+
+        lines = {
+            'close_price': close,
+            'middle_line': middle_line,
+            'std': std,
+            # 计算上轨和下轨（布林带方式）
+            'upper_line': middle_line + std * 2,
+            'lower_line': middle_line - std * 2
+        }
 
         # 计算高点和低点通道（线性回归方式）
-        if len(data) >= 20:
+        if len(close) >= window:
+            x = np.arange(len(close))
+
             # 最近20天的高点连线
-            recent_highs = data['high_price'].tail(20)
-            high_trend = np.polyfit(range(len(recent_highs)), recent_highs, 1)
-            data['high_trend_line'] = np.poly1d(high_trend)(range(len(data)))
+            slope, intercept = self._fit_trend(data['high_price'].to_numpy(dtype=float)[-window:])
+            lines['high_trend_line'] = slope * x + intercept
 
             # 最近20天的低点连线
-            recent_lows = data['low_price'].tail(20)
-            low_trend = np.polyfit(range(len(recent_lows)), recent_lows, 1)
-            data['low_trend_line'] = np.poly1d(low_trend)(range(len(data)))
+            slope, intercept = self._fit_trend(data['low_price'].to_numpy(dtype=float)[-window:])
+            lines['low_trend_line'] = slope * x + intercept
+
+        return pd.DataFrame(lines, index=data.index)
 
-        return data
+    @staticmethod
+    def _fit_trend(values):
+        """一次线性回归的闭式解，返回 (斜率, 截距)"""
+        x = np.arange(len(values))
+        x_centered = x - x.mean()
+        y_mean = values.mean()
+        slope = (x_centered * (values - y_mean)).sum() / (x_centered ** 2).sum()
+        return slope, y_mean - slope * x.mean()
 
     def _analyze_channel_status(self, data):
         """分析通道状态"""
@@ -97,6 +121,17 @@ class ChannelAnalyzer:
         lower_line = latest.get('lower_line', 0)
         middle_line = latest.get('middle_line', 0)
 
+        # 判断通道方向
+        if len(data) >= 10:
+            middle_trend = (data['middle_line'].iloc[-1] - data['middle_line'].iloc[-10]) / data['middle_line'].iloc[
+                -10] * 100
+        else:
+            middle_trend = 0
+
+        return self._classify_channel(current_price, upper_line, lower_line, middle_line, middle_trend)
+
+    def _classify_channel(self, current_price, upper_line, lower_line, middle_line, middle_trend):
+        """根据最新价格、通道线和中轨变化幅度判断通道状态"""
         # 计算通道宽度
         channel_width = (upper_line - lower_line) / middle_line * 100 if middle_line > 0 else 0
 
@@ -106,13 +141,6 @@ class ChannelAnalyzer:
         else:
             position_ratio = 0.5
 
-        # 判断通道方向
-        if len(data) >= 10:
-            middle_trend = (data['middle_line'].iloc[-1] - data['middle_line'].iloc[-10]) / data['middle_line'].iloc[
-                -10] * 100
-        else:
-            middle_trend = 0
-
         # 通道状态判断
         if position_ratio > 0.8:
             position_status = '接近上轨'
@@ -196,29 +224,23 @@ class ChannelAnalyzer:
         # 简化的支撑阻力位计算
         recent_data = data.tail(30)  # 最近30天
 
-        # 寻找局部高点作为阻力位
-        resistance_levels = []
-        for i in range(2, len(recent_data) - 2):
-            current_high = recent_data.iloc[i]['high_price']
-            if (current_high > recent_data.iloc[i - 1]['high_price'] and
-                    current_high > recent_data.iloc[i - 2]['high_price'] and
-                    current_high > recent_data.iloc[i + 1]['high_price'] and
-                    current_high > recent_data.iloc[i + 2]['high_price']):
-                resistance_levels.append(current_high)
-
-        # 寻找局部低点作为支撑位
-        support_levels = []
-        for i in range(2, len(recent_data) - 2):
-            current_low = recent_data.iloc[i]['low_price']
-            if (current_low < recent_data.iloc[i - 1]['low_price'] and
-                    current_low < recent_data.iloc[i - 2]['low_price'] and
-                    current_low < recent_data.iloc[i + 1]['low_price'] and
-                    current_low < recent_data.iloc[i + 2]['low_price']):
-                support_levels.append(current_low)
+        # 寻找局部高点作为阻力位（高于前后各两天）
+        highs = recent_data['high_price'].to_numpy()
+        center = highs[2:-2]
+        is_peak = ((center > highs[1:-3]) & (center > highs[:-4]) &
+                   (center > highs[3:-1]) & (center > highs[4:]))
+        resistance_levels = center[is_peak]
+
+        # 寻找局部低点作为支撑位（低于前后各两天）
+        lows = recent_data['low_price'].to_numpy()
+        center = lows[2:-2]
+        is_trough = ((center < lows[1:-3]) & (center < lows[:-4]) &
+                     (center < lows[3:-1]) & (center < lows[4:]))
+        support_levels = center[is_trough]
 
         # 去重并排序
-        resistance_levels = sorted(list(set(resistance_levels)), reverse=True)[:3]
-        support_levels = sorted(list(set(support_levels)), reverse=True)[:3]
+        resistance_levels = np.unique(resistance_levels)[::-1][:3].tolist()
+        support_levels = np.unique(support_levels)[::-1][:3].tolist()
 
         return {
             'support_levels': support_levels,
@@ -241,51 +263,86 @@ class ChannelAnalyzer:
                 logger.warning("未找到股票数据")
                 return []
 
-            channel_results = []
-
-            for _, stock in stock_list.iterrows():
-                stock_code = stock['stock_code']
-                stock_name = stock['stock_name']
-
+            # 一次性批量获取所有股票的历史数据，再按股票分组
+            end_date = Config.date_strings()[0]
+            start_date = Config.date_strings(60)[0]
+            all_data = basic_data.get_batch_data_from_db(
+                stock_list['stock_code'].tolist(), 'daily', start_date, end_date,
+                columns=['stock_code', 'trade_date', 'close_price', 'high_price', 'low_price']
+            )
+            grouped_data = dict(tuple(all_data.groupby('stock_code', sort=False))) if not all_data.empty else {}
+
+            stocks = []
+            closes = []
+
+            codes = stock_list['stock_code'].to_numpy()
+            names = stock_list['stock_name'].to_numpy()
+
+            # 数据库中没有数据的股票回退到逐只获取，网络请求在线程池中并发执行
+            missing_codes = [code for code in codes if code not in grouped_data]
+            if missing_codes:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    future_to_code = {
+                        executor.submit(basic_data.get_stock_data, code, 'daily', start_date, end_date): code
+                        for code in missing_codes
+                    }
+
+                    for future in concurrent.futures.as_completed(future_to_code):
+                        code = future_to_code[future]
+                        try:
+                            grouped_data[code] = future.result()
+                        except Exception as e:
+                            logger.warning(f"获取股票 {code} 通道数据失败: {e}")
+
+            for stock_code, stock_name in zip(codes, names):
                 try:
-                    # 获取股票历史数据
-                    end_date = datetime.now().strftime('%Y%m%d')
-                    start_date = (datetime.now() - timedelta(days=60)).strftime('%Y%m%d')
+                    stock_data = grouped_data.get(stock_code)
 
-                    stock_data = basic_data.get_stock_data(stock_code, 'daily', start_date, end_date)
-
-                    if stock_data.empty:
+                    if stock_data is None or stock_data.empty or len(stock_data) < 20:
                         continue
 
-                    # 分析通道
-                    result = self.perform_full_channel_analysis(stock_data)
+                    closes.append(stock_data['close_price'].to_numpy(dtype=np.float64))
+                    stocks.append((stock_code, stock_name))
 
-                    if 'error' not in result:
-                        channel_status = result.get('channel_status', {})
+                except Exception as e:
+                    logger.warning(f"获取股票 {stock_code} 通道数据失败: {e}")
+                    continue
 
-                        # 简化通道状态判断
-                        position_status = channel_status.get('position_status', '通道中部')
-                        channel_trend = channel_status.get('channel_trend', '横盘')
+            if not stocks:
+                logger.info("多空通道分析完成，共分析 0 只股票")
+                return []
 
-                        if channel_trend == '上升' and position_status in ['接近下轨', '通道中部']:
-                            status = 'bullish'
-                        elif channel_trend == '下降' and position_status in ['接近上轨', '通道中部']:
-                            status = 'bearish'
-                        else:
-                            status = 'neutral'
+            # 所有股票的收盘价拼接为连续数组，一次调用完成全部通道计算
+            lengths = np.array([len(close) for close in closes], dtype=np.int64)
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+            upper, lower, middle, middle_prev = (np.full(len(stocks), np.nan) for _ in range(4))
+            channel_kernel(np.concatenate(closes), offsets, lengths, 20, upper, lower, middle, middle_prev)
 
-                        channel_results.append({
-                            'stock_code': stock_code,
-                            'stock_name': stock_name,
-                            'channel_status': status,
-                            'channel_trend': channel_trend,
-                            'position_status': position_status,
-                            'channel_width': channel_status.get('channel_width', 0)
-                        })
+            channel_results = []
 
-                except Exception as e:
-                    logger.warning(f"分析股票 {stock_code} 通道失败: {e}")
-                    continue
+            for i, (stock_code, stock_name) in enumerate(stocks):
+                middle_trend = (middle[i] - middle_prev[i]) / middle_prev[i] * 100
+                channel_status = self._classify_channel(closes[i][-1], upper[i], lower[i], middle[i], middle_trend)
+
+                # 简化通道状态判断
+                position_status = channel_status['position_status']
+                channel_trend = channel_status['channel_trend']
+
+                if channel_trend == '上升' and position_status in ['接近下轨', '通道中部']:
+                    status = 'bullish'
+                elif channel_trend == '下降' and position_status in ['接近上轨', '通道中部']:
+                    status = 'bearish'
+                else:
+                    status = 'neutral'
+
+                channel_results.append({
+                    'stock_code': stock_code,
+                    'stock_name': stock_name,
+                    'channel_status': status,
+                    'channel_trend': channel_trend,
+                    'position_status': position_status,
+                    'channel_width': channel_status['channel_width']
+                })
 
             logger.info(f"多空通道分析完成，共分析 {len(channel_results)} 只股票")
             return channel_results
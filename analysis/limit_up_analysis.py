@@ -5,6 +5,7 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 from data.data_fetcher import data_fetcher
 
@@ -12,13 +13,14 @@ from data.data_fetcher import data_fetcher
 class LimitUpAnalyzer:
     """涨停板分析器"""
 
-    def __init__(self):
+    def __init__(self, max_concurrency=10):
         self.data_fetcher = data_fetcher
+        self.max_concurrency = max_concurrency  # 实时数据并发请求上限
+        self._st_codes_cache = None  # (日期, ST股票代码集合)，ST名单一天内基本不变
 
     def generate_limit_up_report(self, trade_date):
         """生成涨停板报告 - 使用实时行情数据"""
         try:
-            import time
             # 获取股票列表
             stock_list = self.data_fetcher.get_stock_list()
 
@@ -31,66 +33,24 @@ class LimitUpAnalyzer:
 
             limit_up_stocks = []
 
-            # API调用计数器
-            api_call_count = 0
-
             # 获取所有股票代码列表
             stock_codes = stock_list['code'].tolist() if 'code' in stock_list.columns else []
+            st_codes = self._get_st_codes(stock_list)
 
-            # 分批获取实时数据，避免超时
+            # 分批获取实时数据，避免超时；各批次在线程池中并发请求
             batch_size = 50
-            for i in range(0, len(stock_codes), batch_size):
-                batch_codes = stock_codes[i:i + batch_size]
-
-                try:
-                    # 使用实时行情数据
-                    realtime_data = self.data_fetcher.get_realtime_data(batch_codes)
-                    api_call_count += 1
-
-                    # 每调用10次API后休息1秒
-                    if api_call_count % 10 == 0:
-                        logger.info(f"已调用API {api_call_count} 次，休息1秒...")
-                        time.sleep(1)
-                    else:
-                        time.sleep(0.2)  # 正常调用间隔0.2秒
-
-                    if not realtime_data.empty:
-                        for _, stock in realtime_data.iterrows():
-                            try:
-                                stock_code = stock.get('code', '')
-                                stock_name = stock.get('name', '')
-                                current_price = stock.get('current_price', 0)
-                                change_pct = stock.get('change_pct', 0)
-                                volume = stock.get('volume', 0)
-                                amount = stock.get('amount', 0)
-
-                                if not stock_code:
-                                    continue
-
-                                # 判断是否涨停（A股一般涨幅限制为10%，ST股为5%）
-                                is_st = 'ST' in str(stock_name) or 'st' in str(stock_name).lower()
-                                limit_threshold = 4.9 if is_st else 9.9  # 考虑到实际交易中的微小差异
-
-                                if change_pct >= limit_threshold:
-                                    limit_up_stocks.append({
-                                        'stock_code': stock_code,
-                                        'stock_name': stock_name,
-                                        'current_price': round(current_price, 2) if current_price else 0,
-                                        'change_pct': round(change_pct, 2),
-                                        'volume': volume,
-                                        'amount': amount,
-                                        'limit_up_type': 'ST涨停' if is_st else '普通涨停'
-                                    })
-
-                            except Exception as e:
-                                logger.warning(f"处理股票 {stock_code} 实时数据失败: {e}")
-                                continue
+            batches = [stock_codes[i:i + batch_size] for i in range(0, len(stock_codes), batch_size)]
+            batch_results = self._fetch_realtime_batches(batches)
 
-                except Exception as e:
-                    logger.error(f"获取第 {i//batch_size + 1} 批实时数据失败: {e}")
+            for batch_index, realtime_data in enumerate(batch_results, 1):
+                if isinstance(realtime_data, Exception):
+                    logger.error(f"获取第 {batch_index} 批实时数据失败: {realtime_data}")
                     continue
 
-                logger.info(f"已处理 {min(i + batch_size, len(stock_codes))}/{len(stock_codes)} 只股票")
+                if not realtime_data.empty:
+                    limit_up_stocks.extend(self._filter_limit_up_stocks(realtime_data, st_codes))
+
+            logger.info(f"已处理 {len(stock_codes)} 只股票，共 {len(batches)} 批实时数据")
 
             # 按涨幅排序
             limit_up_stocks.sort(key=lambda x: x['change_pct'], reverse=True)
@@ -116,6 +76,57 @@ class LimitUpAnalyzer:
                 'total_count': 0
             }
 
+    def _fetch_realtime_batches(self, batches):
+        """并发获取多批实时行情数据，返回结果与批次顺序一致，失败的批次对应其异常"""
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = [executor.submit(self.data_fetcher.get_realtime_data, batch) for batch in batches]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+        return results
+
+    def _get_st_codes(self, stock_list):
+        """获取当天的ST股票代码集合，股票列表缺少名称列时返回None"""
+        today = datetime.now().date()
+        if self._st_codes_cache and self._st_codes_cache[0] == today:
+            return self._st_codes_cache[1]
+
+        if 'code' not in stock_list.columns or 'name' not in stock_list.columns:
+            return None
+
+        is_st = stock_list['name'].fillna('').astype(str).str.upper().str.contains('ST', regex=False)
+        st_codes = set(stock_list.loc[is_st, 'code'].astype(str))
+        self._st_codes_cache = (today, st_codes)
+        return st_codes
+
+    def _filter_limit_up_stocks(self, realtime_data, st_codes=None):
+        """向量化筛选一批实时行情中的涨停股票"""
+        # 缺失的列按原逐行处理时的默认值补齐
+        defaults = {'code': '', 'name': '', 'current_price': 0, 'change_pct': 0, 'volume': 0, 'amount': 0}
+        data = realtime_data.assign(**{col: value for col, value in defaults.items()
+                                       if col not in realtime_data.columns})
+        data = data.loc[data['code'].fillna('').astype(str) != '', list(defaults)]
+
+        # 判断是否涨停（A股一般涨幅限制为10%，ST股为5%）
+        if st_codes is not None:
+            is_st = data['code'].astype(str).isin(st_codes).to_numpy()
+        else:
+            is_st = data['name'].fillna('').astype(str).str.upper().str.contains('ST', regex=False).to_numpy()
+        limit_threshold = np.where(is_st, 4.9, 9.9)  # 考虑到实际交易中的微小差异
+        change_pct = pd.to_numeric(data['change_pct'], errors='coerce').to_numpy()
+        hit = change_pct >= limit_threshold
+
+        limit_up = data[hit].rename(columns={'code': 'stock_code', 'name': 'stock_name'})
+        limit_up = limit_up.assign(
+            current_price=pd.to_numeric(limit_up['current_price'], errors='coerce').round(2).fillna(0),
+            change_pct=change_pct[hit].round(2),
+            limit_up_type=np.where(is_st[hit], 'ST涨停', '普通涨停')
+        )
+        return limit_up.to_dict('records')
+
     def _analyze_limit_up_pattern(self, limit_up_stocks):
         """分析涨停板模式"""
         if not limit_up_stocks:
@@ -2,11 +2,21 @@
 三层共振分析模块
 """
 
+import copy
+import heapq
+import operator
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from loguru import logger
+from core.app_config import Config
 from data.basic_data import basic_data
+from analysis._kernels import resonance_score, volume_tail_means
+
+
+# 共振评分内核依次使用的列
+RESONANCE_COLUMNS = ('close_price', 'ma_5', 'ma_20', 'volume', 'change_pct', 'amplitude')
 
 
 class ResonanceAnalyzer:
@@ -14,13 +24,33 @@ class ResonanceAnalyzer:
 
     def __init__(self):
         self.basic_data = basic_data
+        self._analysis_cache = {}  # {股票代码: 分析结果}，只保存当前更新周期的结果
+        self._cache_period = None  # _analysis_cache对应的时间段编号
 
     def perform_full_analysis(self, stock_code):
-        """执行完整的三层共振分析"""
+        """执行完整的三层共振分析，同一更新周期（UPDATE_INTERVAL_MINUTES）内复用成功的结果"""
+        period = int(time.time() // (Config.UPDATE_INTERVAL_MINUTES * 60))
+        if period != self._cache_period:
+            # 进入新的更新周期，丢弃上一周期的全部结果
+            self._analysis_cache = {}
+            self._cache_period = period
+
+        cached = self._analysis_cache.get(stock_code)
+        if cached is not None:
+            # 返回副本，调用方修改结果不影响缓存
+            return copy.deepcopy(cached)
+
+        result = self._perform_full_analysis(stock_code)
+        if 'error' not in result:
+            self._analysis_cache[stock_code] = copy.deepcopy(result)
+        return result
+
+    def _perform_full_analysis(self, stock_code):
+        """获取历史数据并计算技术指标后执行三层共振分析"""
         try:
             # 获取历史数据
-            end_date = datetime.now().strftime('%Y%m%d')
-            start_date = (datetime.now() - timedelta(days=180)).strftime('%Y%m%d')
+            end_date = Config.date_strings()[0]
+            start_date = Config.date_strings(180)[0]
 
             stock_data = self.basic_data.get_stock_data(stock_code, 'daily', start_date, end_date)
 
@@ -34,10 +64,23 @@ class ResonanceAnalyzer:
             # 计算技术指标
             stock_data = self.basic_data.calculate_technical_indicators(stock_data)
 
+            return self.perform_full_analysis_from_df(stock_code, stock_data)
+
+        except Exception as e:
+            logger.error(f"三层共振分析失败: {e}")
+            return {
+                'error': str(e),
+                'resonance_score': 0,
+                'signals': []
+            }
+
+    def perform_full_analysis_from_df(self, stock_code, stock_data):
+        """基于已计算技术指标（需包含ma_5、ma_20）的历史数据执行三层共振分析"""
+        try:
             # 分析结果
             result = {
                 'stock_code': stock_code,
-                'analysis_date': datetime.now().strftime('%Y-%m-%d'),
+                'analysis_date': Config.date_strings()[1],
                 'resonance_score': self._calculate_resonance_score(stock_data),
                 'trend_analysis': self._analyze_trend(stock_data),
                 'volume_analysis': self._analyze_volume(stock_data),
@@ -45,7 +88,7 @@ class ResonanceAnalyzer:
                 'signals': self._generate_signals(stock_data)
             }
 
-            logger.info(f"股票 {stock_code} 三层共振分析完成")
+            logger.debug("股票 {} 三层共振分析完成", stock_code)
             return result
 
         except Exception as e:
@@ -58,39 +101,40 @@ class ResonanceAnalyzer:
 
     def _calculate_resonance_score(self, data):
         """计算共振评分"""
-        if data.empty or len(data) < 20:
+        if data.empty:
             return 0
 
-        latest = data.iloc[-1]
-        score = 0
+        return self._score_arrays(self._column_arrays(data))
 
-        # 价格趋势评分
-        if 'ma_5' in latest and 'ma_20' in latest:
-            if latest['close_price'] > latest['ma_5'] > latest['ma_20']:
-                score += 30
-
-        # 成交量评分
-        recent_volume = data['volume'].tail(5).mean()
-        historical_volume = data['volume'].tail(20).mean()
-        if recent_volume > historical_volume * 1.2:
-            score += 30
+    @staticmethod
+    def _score_arrays(columns):
+        """对RESONANCE_COLUMNS各列数组计算共振评分，数据不足20天时为0"""
+        if len(columns[0]) < 20:
+            return 0
 
-        # 技术指标评分
-        if 'change_pct' in latest and latest['change_pct'] > 0:
-            score += 20
+        return int(resonance_score(*columns))
 
-        # 振幅评分
-        if 'amplitude' in latest and latest['amplitude'] > 3:
-            score += 20
+    @staticmethod
+    def _column_arrays(data):
+        """按RESONANCE_COLUMNS顺序取出各列的float64数组"""
+        # 缺失的列以NaN数组代替，NaN参与的比较均为False，与原逐列判断一致
+        missing = np.full(len(data), np.nan)
+        return [
+            data[col].to_numpy(dtype=np.float64, na_value=np.nan) if col in data.columns else missing
+            for col in RESONANCE_COLUMNS
+        ]
 
-        return min(score, 100)
+    @staticmethod
+    def _latest_row(data):
+        """以dict取出最后一行，成员判断和取值走哈希查找，避免构造Series"""
+        return dict(zip(data.columns, next(data.tail(1).itertuples(index=False, name=None))))
 
     def _analyze_trend(self, data):
         """趋势分析"""
         if data.empty:
             return {'trend': 'unknown', 'strength': 0}
 
-        latest = data.iloc[-1]
+        latest = self._latest_row(data)
         trend = 'sideways'
         strength = 0
 
@@ -115,8 +159,9 @@ class ResonanceAnalyzer:
         if data.empty or len(data) < 10:
             return {'volume_trend': 'unknown', 'volume_ratio': 0}
 
-        recent_volume = data['volume'].tail(5).mean()
-        historical_volume = data['volume'].tail(20).mean()
+        recent_volume, historical_volume = volume_tail_means(
+            data['volume'].to_numpy(dtype=np.float64, na_value=np.nan)
+        )
         volume_ratio = recent_volume / historical_volume if historical_volume > 0 else 0
 
         volume_trend = 'normal'
@@ -137,7 +182,7 @@ class ResonanceAnalyzer:
         if data.empty:
             return {'signals': []}
 
-        latest = data.iloc[-1]
+        latest = self._latest_row(data)
         signals = []
 
         # 均线信号
@@ -165,8 +210,11 @@ class ResonanceAnalyzer:
         if data.empty:
             return []
 
+        return self._signals_from_latest(self._latest_row(data))
+
+    def _signals_from_latest(self, latest):
+        """根据最新一行的 {列名: 值} 生成交易信号"""
         signals = []
-        latest = data.iloc[-1]
 
         # 买入信号
         if 'ma_5' in latest and 'ma_20' in latest:
@@ -188,8 +236,8 @@ class ResonanceAnalyzer:
 
         return signals
 
-    def analyze_all_stocks(self):
-        """分析所有股票的三层共振情况"""
+    def analyze_all_stocks(self, top_k=None):
+        """分析所有股票的三层共振情况，top_k指定时只返回评分最高的前top_k只"""
         try:
             from data.enhanced_database import enhanced_db_manager
 
@@ -203,39 +251,74 @@ class ResonanceAnalyzer:
                 logger.warning("未找到股票数据")
                 return []
 
-            resonance_stocks = []
+            # 一次性批量获取所有股票近180天的数据，并按股票分组计算指标
+            end_date = Config.date_strings()[0]
+            start_date = Config.date_strings(180)[0]
+            all_data = self.basic_data.get_batch_data_from_db(
+                stock_list['stock_code'].tolist(), 'daily', start_date, end_date,
+                columns=['stock_code', 'trade_date', 'open_price', 'high_price', 'low_price',
+                         'close_price', 'volume', 'change_pct']
+            )
+            # 全部股票的各列只转换一次为数组，每只股票按区间切片，不再逐只构造子DataFrame
+            stock_bounds = {}
+            if not all_data.empty:
+                data = self._calculate_group_indicators(all_data)
+                arrays = self._column_arrays(data)
+                codes = data['stock_code'].to_numpy()
+                starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+                stock_bounds = dict(zip(codes[starts], zip(starts, np.r_[starts[1:], len(codes)])))
 
-            for _, stock in stock_list.iterrows():
-                stock_code = stock['stock_code']
-                stock_name = stock['stock_name']
+            resonance_stocks = []
 
+            for stock_code, stock_name in zip(stock_list['stock_code'].to_numpy(), stock_list['stock_name'].to_numpy()):
                 try:
-                    # 分析单个股票
-                    result = self.perform_full_analysis(stock_code)
+                    bounds = stock_bounds.get(stock_code)
+
+                    if bounds is not None:
+                        start, end = bounds
+                        score = self._score_arrays([a[start:end] for a in arrays])
+                        signals = self._signals_from_latest(
+                            {col: a[end - 1] for col, a in zip(RESONANCE_COLUMNS, arrays)}
+                        )
+                    else:
+                        # 数据库中没有该股票数据时，回退到单只股票完整分析
+                        result = self.perform_full_analysis(stock_code)
+                        score = result.get('resonance_score', 0)
+                        signals = result.get('signals', [])
 
                     # 如果共振评分大于80，认为符合条件
-                    if result.get('resonance_score', 0) >= 80:
+                    if score >= 80:
                         resonance_stocks.append({
                             'stock_code': stock_code,
                             'stock_name': stock_name,
-                            'resonance_score': result['resonance_score'],
-                            'signals': result.get('signals', [])
+                            'resonance_score': score,
+                            'signals': signals
                         })
 
                 except Exception as e:
                     logger.warning(f"分析股票 {stock_code} 失败: {e}")
                     continue
 
-            # 按共振评分排序
-            resonance_stocks.sort(key=lambda x: x['resonance_score'], reverse=True)
-
             logger.info(f"三层共振分析完成，发现 {len(resonance_stocks)} 只符合条件的股票")
-            return resonance_stocks
+
+            # 按共振评分排序，只需前top_k只时用堆选取
+            return heapq.nlargest(top_k or len(resonance_stocks), resonance_stocks,
+                                  key=operator.itemgetter('resonance_score'))
 
         except Exception as e:
             logger.error(f"批量分析失败: {e}")
             return []
 
+    def _calculate_group_indicators(self, all_data):
+        """对按股票代码和日期排序的多股票数据，分组计算共振评分所需的均线和振幅"""
+        close = all_data.groupby('stock_code', sort=False)['close_price']
+
+        new_columns = {f'ma_{window}': close.rolling(window).mean().droplevel(0) for window in [5, 20]}
+        new_columns['amplitude'] = (all_data['high_price'] - all_data['low_price']) / close.shift(1) * 100
+
+        # 新列一次拼接，不复制整个输入数据
+        return pd.concat([all_data, pd.DataFrame(new_columns, index=all_data.index)], axis=1)
+
 
 # 创建全局实例
 resonance_analyzer = ResonanceAnalyzer()
@@ -2,16 +2,23 @@
 Flask应用主文件 - A股股票分析系统API
 优化版本：支持超时机制和多数据源自动切换
 """
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, request, jsonify, render_template, send_from_directory, Response
 from flask_cors import CORS
 import os
 import json
+import time
+import itertools
+import numpy as np
+import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List
 import asyncio
 from core.app_config import Config
+from core.cache import cached, skip_cache
+from core.response import df_response, df_columns_response, df_stream_response, init_json_provider
 from core.models import init_database, get_db_session, SessionLocal
 from data.data_fetcher import data_fetcher
+from data.tick_data import tick_data
 from analysis.resonance_analysis import resonance_analyzer
 from analysis.limit_up_analysis import limit_up_analyzer
 from analysis.anomaly_detection import anomaly_detector
@@ -26,10 +33,39 @@ CORS(app)
 # 配置
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 app.config['JSON_AS_ASCII'] = False
+init_json_provider(app)
+
+# WSGI入口: gunicorn -c core/gunicorn_conf.py core.app:app
 
 # 初始化数据库
 init_database()
 
+# 历史行情图表字段: DataFrame列名 -> 接口字段名
+CHART_COLUMNS = {
+    'trade_date': 'date',
+    'open_price': 'open',
+    'high_price': 'high',
+    'low_price': 'low',
+    'close_price': 'close',
+    'volume': 'volume',
+    'ma_5': 'ma5',
+    'ma_10': 'ma10',
+    'ma_20': 'ma20',
+    'rsi': 'rsi',
+    'macd_dif': 'macd_dif',
+    'macd_dea': 'macd_dea',
+    'highlight_candle': 'highlight'
+}
+
+# 股票列表进程内缓存: (生成时间, 响应体)，Redis不可用时同样生效
+_stock_list_cache = None
+
+# 健康检查探测结果缓存: (检查时间, 数据是否可用)
+_health_cache = None
+
+# 股票搜索索引缓存: (股票列表获取时间, 股票列表, 小写代码数组, 小写名称数组)
+_search_index = None
+
 
 @app.route('/')
 def index():
@@ -43,30 +79,38 @@ def index():
 
 
 @app.route('/api/stock/list')
+@cached()
 def get_stock_list():
     """获取股票列表"""
+    global _stock_list_cache
+
     try:
+        now = time.monotonic()
+        if _stock_list_cache and now - _stock_list_cache[0] < Config.CACHE_TTL_SECONDS:
+            return Response(_stock_list_cache[1], mimetype='application/json')
+
         stock_list = data_fetcher.get_stock_list()
 
         if stock_list.empty:
+            skip_cache()
             return jsonify({
                 'code': 404,
                 'message': '获取股票列表失败',
                 'data': []
             })
 
-        # 转换为字典列表
-        stocks = stock_list.to_dict('records')
-
-        return jsonify({
-            'code': 200,
-            'message': '获取成功',
-            'data': stocks[:100],  # 限制返回数量
-            'total': len(stocks)
-        })
+        response = df_response(
+            stock_list.head(100),  # 限制返回数量
+            code=200,
+            message='获取成功',
+            total=len(stock_list)
+        )
+        _stock_list_cache = (now, response.get_data())
+        return response
 
     except Exception as e:
         logger.error(f"获取股票列表失败: {e}")
+        skip_cache()
         return jsonify({
             'code': 500,
             'message': f'服务器错误: {str(e)}',
@@ -109,9 +153,8 @@ def get_historical_data(stock_code):
     """获取历史行情数据"""
     try:
         # 获取查询参数
-        start_date = request.args.get('start_date',
-                                      (datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d'))
-        end_date = request.args.get('end_date', datetime.now().strftime('%Y-%m-%d'))
+        start_date = request.args.get('start_date', Config.date_strings(180)[1])
+        end_date = request.args.get('end_date', Config.date_strings()[1])
 
         historical_data = data_fetcher.get_historical_data(stock_code, start_date, end_date)
 
@@ -125,33 +168,51 @@ def get_historical_data(stock_code):
         # 添加技术指标
         data_with_indicators = technical_analyzer.calculate_all_indicators(historical_data)
 
-        # 转换为前端需要的格式
-        chart_data = []
-        for _, row in data_with_indicators.iterrows():
-            chart_data.append({
-                'date': row['trade_date'].strftime('%Y-%m-%d'),
-                'open': row['open_price'],
-                'high': row['high_price'],
-                'low': row['low_price'],
-                'close': row['close_price'],
-                'volume': row['volume'],
-                'ma5': row.get('ma_5'),
-                'ma10': row.get('ma_10'),
-                'ma20': row.get('ma_20'),
-                'rsi': row.get('rsi'),
-                'macd_dif': row.get('macd_dif'),
-                'macd_dea': row.get('macd_dea'),
-                'highlight': row.get('highlight_candle', False)  # 黄色蜡烛图标记
-            })
+        # 按列输出为图表需要的 {字段: [值, ...]} 格式，缺失的指标列输出为null
+        chart_data = data_with_indicators.reindex(columns=list(CHART_COLUMNS)).rename(columns=CHART_COLUMNS)
+        chart_data['date'] = pd.to_datetime(chart_data['date']).dt.strftime('%Y-%m-%d')
+        chart_data['highlight'] = chart_data['highlight'].fillna(False).astype(bool)  # 黄色蜡烛图标记
 
+        return df_columns_response(chart_data, code=200, message='获取成功')
+
+    except Exception as e:
+        logger.error(f"获取{stock_code}历史数据失败: {e}")
         return jsonify({
-            'code': 200,
-            'message': '获取成功',
-            'data': chart_data
+            'code': 500,
+            'message': f'服务器错误: {str(e)}',
+            'data': []
         })
 
+
+@app.route('/api/stock/<stock_code>/tick')
+def get_tick_data(stock_code):
+    """获取分笔数据（流式输出）"""
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+
+        # 服务端游标分块读取，边读边输出
+        chunks = (chunk for chunk in tick_data.iter_tick_data_from_db(stock_code, start_date, end_date,
+                                                                       chunksize=50000)
+                  if not chunk.empty)
+        first_chunk = next(chunks, None)
+
+        if first_chunk is None:
+            return jsonify({
+                'code': 404,
+                'message': '未找到分笔数据',
+                'data': []
+            })
+
+        return df_stream_response(
+            itertools.chain([first_chunk], chunks),
+            code=200,
+            message='获取成功',
+            stock_code=stock_code
+        )
+
     except Exception as e:
-        logger.error(f"获取{stock_code}历史数据失败: {e}")
+        logger.error(f"获取{stock_code}分笔数据失败: {e}")
         return jsonify({
             'code': 500,
             'message': f'服务器错误: {str(e)}',
@@ -184,7 +245,7 @@ def get_resonance_analysis(stock_code):
 def get_limit_up_analysis():
     """获取涨停板分析"""
     try:
-        trade_date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+        trade_date = request.args.get('date', Config.date_strings()[1])
 
         limit_up_report = limit_up_analyzer.generate_limit_up_report(trade_date)
 
@@ -208,8 +269,8 @@ def get_channel_analysis(stock_code):
     """获取多空通道分析"""
     try:
         # 获取历史数据
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d')
+        end_date = Config.date_strings()[1]
+        start_date = Config.date_strings(180)[1]
         stock_data = data_fetcher.get_historical_data(stock_code, start_date, end_date)
 
         if stock_data.empty:
@@ -298,13 +359,7 @@ def get_sector_data():
                 'data': []
             })
 
-        sectors = sector_data.to_dict('records')
-
-        return jsonify({
-            'code': 200,
-            'message': '获取成功',
-            'data': sectors
-        })
+        return df_response(sector_data, code=200, message='获取成功')
 
     except Exception as e:
         logger.error(f"获取板块数据失败: {e}")
@@ -319,9 +374,9 @@ def get_sector_data():
 def get_comprehensive_analysis(stock_code):
     """获取综合分析（包含所有分析模块）"""
     try:
-        # 获取历史数据
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d')
+        # 获取历史数据（只获取一次，各分析模块共用）
+        end_date = Config.date_strings()[1]
+        start_date = Config.date_strings(180)[1]
         stock_data = data_fetcher.get_historical_data(stock_code, start_date, end_date)
 
         if stock_data.empty:
@@ -334,14 +389,16 @@ def get_comprehensive_analysis(stock_code):
         # 执行综合分析
         result = {}
 
+        # 技术指标只计算一次
+        data_with_indicators = technical_analyzer.calculate_all_indicators(stock_data)
+
         # 三层共振分析
-        result['resonance'] = resonance_analyzer.perform_full_analysis(stock_code)
+        result['resonance'] = resonance_analyzer.perform_full_analysis_from_df(stock_code, data_with_indicators)
 
-        # 通道分析
-        result['channel'] = channel_analyzer.perform_full_channel_analysis(stock_data)
+        # 通道分析（复用已计算的20日布林带作为通道中轨和标准差）
+        result['channel'] = channel_analyzer.perform_full_channel_analysis(data_with_indicators)
 
         # 技术指标分析
-        data_with_indicators = technical_analyzer.calculate_all_indicators(stock_data)
         if not data_with_indicators.empty:
             latest_indicators = data_with_indicators.iloc[-1].to_dict()
             result['technical'] = {
@@ -349,11 +406,8 @@ def get_comprehensive_analysis(stock_code):
                 'signals': technical_analyzer.generate_trading_signals(data_with_indicators)
             }
 
-        # 异动检测
-        anomalies = anomaly_detector.detect_price_anomaly(stock_data)
-        anomalies.extend(anomaly_detector.detect_volume_anomaly(stock_data))
-        anomalies.extend(anomaly_detector.detect_turnover_anomaly(stock_data))
-        result['anomalies'] = anomalies
+        # 异动检测（一次检测全部类型）
+        result['anomalies'] = anomaly_detector.detect_stock_anomalies(stock_data)
 
         return jsonify({
             'code': 200,
@@ -370,6 +424,24 @@ def get_comprehensive_analysis(stock_code):
         })
 
 
+def _get_search_index():
+    """获取股票搜索索引，data_fetcher的股票列表缓存刷新后随之重建"""
+    global _search_index
+
+    stock_list = data_fetcher.get_stock_list()
+    if stock_list.empty:
+        return stock_list, None, None
+
+    fetched_at = data_fetcher.stock_list_fetched_at
+    if _search_index and _search_index[0] == fetched_at:
+        return _search_index[1:]
+
+    code_lower = stock_list['code'].fillna('').astype(str).str.lower().to_numpy(dtype=str)
+    name_lower = stock_list['name'].fillna('').astype(str).str.lower().to_numpy(dtype=str)
+    _search_index = (fetched_at, stock_list, code_lower, name_lower)
+    return _search_index[1:]
+
+
 @app.route('/api/search')
 def search_stocks():
     """搜索股票"""
@@ -382,8 +454,8 @@ def search_stocks():
                 'data': []
             })
 
-        # 获取股票列表
-        stock_list = data_fetcher.get_stock_list()
+        # 获取股票列表及预先转为小写的代码、名称数组
+        stock_list, code_lower, name_lower = _get_search_index()
 
         if stock_list.empty:
             return jsonify({
@@ -392,17 +464,12 @@ def search_stocks():
                 'data': []
             })
 
-        # 搜索匹配的股票
-        mask = (stock_list['code'].str.contains(query, case=False, na=False) |
-                stock_list['name'].str.contains(query, case=False, na=False))
-
-        results = stock_list[mask].head(20).to_dict('records')
+        # 按字面子串匹配代码或名称（不区分大小写）
+        keyword = query.lower()
+        mask = np.char.find(code_lower, keyword) >= 0
+        mask |= np.char.find(name_lower, keyword) >= 0
 
-        return jsonify({
-            'code': 200,
-            'message': '搜索完成',
-            'data': results
-        })
+        return df_response(stock_list[mask].head(20), code=200, message='搜索完成')
 
     except Exception as e:
         logger.error(f"搜索股票失败: {e}")
@@ -417,18 +484,7 @@ def search_stocks():
 def get_config():
     """获取系统配置"""
     try:
-        config_data = {
-            'update_interval': Config.UPDATE_INTERVAL_MINUTES,
-            'market_open': Config.is_market_open(),
-            'data_sources': Config.DATA_SOURCES,
-            'thresholds': {
-                'price_change': Config.PRICE_CHANGE_THRESHOLD,
-                'volume_ratio': Config.VOLUME_RATIO_THRESHOLD,
-                'turnover': Config.TURNOVER_THRESHOLD
-            },
-            'timeout_seconds': Config.TIMEOUT_SECONDS,
-            'max_retries': Config.MAX_RETRIES
-        }
+        config_data = dict(Config.CONFIG_SNAPSHOT, market_open=Config.is_market_open())
 
         return jsonify({
             'code': 200,
@@ -448,10 +504,16 @@ def get_config():
 @app.route('/api/health')
 def health_check():
     """健康检查"""
+    global _health_cache
+
     try:
-        # 测试数据获取功能
-        test_result = data_fetcher.get_stock_list()
-        data_available = not test_result.empty
+        # 测试数据获取功能，短时间内的重复探测直接复用上次结果
+        now = time.monotonic()
+        if _health_cache and now - _health_cache[0] < Config.HEALTH_CHECK_CACHE_SECONDS:
+            data_available = _health_cache[1]
+        else:
+            data_available = not data_fetcher.get_stock_list().empty
+            _health_cache = (now, data_available)
 
         return jsonify({
             'code': 200,
@@ -505,8 +567,9 @@ def internal_error(error):
 @app.before_request
 def before_request():
     """请求前处理"""
-    # 记录请求日志
-    logger.info(f"Request: {request.method} {request.url}")
+    # 记录请求日志，健康检查轮询不记录
+    if request.path != '/api/health':
+        logger.info("Request: {} {}", request.method, request.url)
 
 
 @app.after_request
@@ -536,9 +599,11 @@ if __name__ == '__main__':
     logger.info("A股股票分析系统启动中...")
     logger.info("系统特性：支持超时机制和多数据源自动切换")
 
-    # 启动Flask应用
+    # 启动Flask开发服务器，仅用于本地调试
+    # 生产环境使用 gunicorn -c core/gunicorn_conf.py core.app:app 启动
     app.run(
         host=Config.FLASK_HOST,
         port=Config.FLASK_PORT,
-        debug=Config.FLASK_DEBUG
+        debug=Config.FLASK_DEBUG,
+        threaded=True
     )
@@ -3,7 +3,31 @@ Flask应用配置模块
 """
 
 import os
-from datetime import datetime
+import time
+import functools
+from types import MappingProxyType
+from datetime import datetime, timedelta
+
+
+@functools.lru_cache(maxsize=16)
+def _date_strings(minute, days_ago):
+    """按分钟缓存日期字符串，minute仅作为缓存键"""
+    day = datetime.now() - timedelta(days=days_ago)
+    return day.strftime('%Y%m%d'), day.strftime('%Y-%m-%d')
+
+
+@functools.lru_cache(maxsize=1)
+def _is_market_open(weekday, minute_of_day):
+    """按 (星期, 当天分钟数) 缓存开市判断"""
+    # 周末不开市
+    if weekday >= 5:
+        return False
+
+    # 交易时间：9:30-11:30, 13:00-15:00
+    morning_open = 570 <= minute_of_day <= 690
+    afternoon_open = 780 <= minute_of_day <= 900
+
+    return morning_open or afternoon_open
 
 
 class Config:
@@ -19,7 +43,21 @@ class Config:
     # Flask配置
     FLASK_HOST = '0.0.0.0'
     FLASK_PORT = 5000
-    FLASK_DEBUG = True
+    FLASK_DEBUG = os.environ.get('FLASK_DEBUG', '0') == '1'  # 生产环境保持关闭
+
+    # 生产部署配置（gunicorn gthread 工作模式）
+    GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', os.cpu_count() or 1))
+    GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 16))
+
+    # 缓存配置
+    REDIS_HOST = 'localhost'
+    REDIS_PORT = 6379
+    REDIS_DB = 0
+    REDIS_SOCKET_TIMEOUT = 0.5
+    REDIS_RETRY_INTERVAL = 60
+    CACHE_KEY_PREFIX = 'stock_api'
+    CACHE_TTL_SECONDS = 3600
+    HEALTH_CHECK_CACHE_SECONDS = 5
 
     # 日志配置
     LOG_LEVEL = 'INFO'
@@ -34,23 +72,32 @@ class Config:
     PRICE_CHANGE_THRESHOLD = 5.0
     VOLUME_RATIO_THRESHOLD = 2.0
     TURNOVER_THRESHOLD = 15.0
+    # 异动监控并发获取数据的线程数，每个请求占用共享取数线程池的一个线程，不超过data.http_session.FETCH_WORKERS
+    ANOMALY_WORKERS = 8
 
     # 数据源配置
     DATA_SOURCES = ['akshare_primary', 'akshare_backup', 'akshare_alternative']
 
+    # 对外公开的静态配置快照（只读），/api/config 只需补充实时的开市状态
+    CONFIG_SNAPSHOT = MappingProxyType({
+        'update_interval': UPDATE_INTERVAL_MINUTES,
+        'data_sources': tuple(DATA_SOURCES),
+        'thresholds': {
+            'price_change': PRICE_CHANGE_THRESHOLD,
+            'volume_ratio': VOLUME_RATIO_THRESHOLD,
+            'turnover': TURNOVER_THRESHOLD
+        },
+        'timeout_seconds': TIMEOUT_SECONDS,
+        'max_retries': MAX_RETRIES
+    })
+
+    @classmethod
+    def date_strings(cls, days_ago=0):
+        """返回days_ago天前的日期字符串 (YYYYMMDD, YYYY-MM-DD)，一分钟内复用同一结果"""
+        return _date_strings(int(time.time() // 60), days_ago)
+
     @classmethod
     def is_market_open(cls):
         """判断市场是否开放"""
         now = datetime.now()
-        weekday = now.weekday()
-
-        # 周末不开市
-        if weekday >= 5:
-            return False
-
-        # 交易时间：9:30-11:30, 13:00-15:00
-        time_str = now.strftime('%H:%M')
-        morning_open = '09:30' <= time_str <= '11:30'
-        afternoon_open = '13:00' <= time_str <= '15:00'
-
-        return morning_open or afternoon_open
\ No newline at end of file
+        return _is_market_open(now.weekday(), now.hour * 60 + now.minute)
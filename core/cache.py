@@ -0,0 +1,136 @@
+"""
+接口响应缓存模块
+基于Redis的键值缓存，按 (接口路径, 查询参数) 缓存JSON响应
+Redis不可用时自动退化为直接执行接口函数
+"""
+
+import functools
+import re
+import time
+from urllib.parse import urlencode
+from flask import g, request, Response
+from loguru import logger
+from core.app_config import Config
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+_redis_client = None
+_redis_retry_at = 0.0  # 连接失败后，在此时间点之前不再重试
+
+
+def get_redis_client():
+    """获取Redis客户端（延迟创建，连接失败时返回None）"""
+    global _redis_client, _redis_retry_at
+
+    if redis is None:
+        return None
+
+    if _redis_client is None:
+        if time.monotonic() < _redis_retry_at:
+            return None
+
+        try:
+            client = redis.Redis(
+                host=Config.REDIS_HOST,
+                port=Config.REDIS_PORT,
+                db=Config.REDIS_DB,
+                socket_timeout=Config.REDIS_SOCKET_TIMEOUT
+            )
+            client.ping()
+            _redis_client = client
+            logger.info("Redis缓存连接成功")
+        except redis.RedisError as e:
+            _redis_retry_at = time.monotonic() + Config.REDIS_RETRY_INTERVAL
+            logger.warning(f"Redis缓存不可用，跳过缓存: {e}")
+            return None
+
+    return _redis_client
+
+
+def _on_redis_error(action, e):
+    """Redis操作失败：丢弃客户端，REDIS_RETRY_INTERVAL秒内不再连接，避免每个请求都等待超时"""
+    global _redis_client, _redis_retry_at
+
+    _redis_client = None
+    _redis_retry_at = time.monotonic() + Config.REDIS_RETRY_INTERVAL
+    logger.warning(f"{action}失败，暂停使用缓存: {e}")
+
+
+def invalidate(prefix):
+    """删除接口路径以prefix开头的全部缓存，数据写入后调用；返回删除的键数"""
+    client = get_redis_client()
+    if client is None:
+        return 0
+
+    # 路径中的glob特殊字符按字面匹配
+    escaped = re.sub(r'([*?\[\]\\])', r'\\\1', prefix)
+    pattern = f"{Config.CACHE_KEY_PREFIX}:{escaped}*"
+    deleted = 0
+    try:
+        keys = []
+        for key in client.scan_iter(match=pattern, count=500):
+            keys.append(key)
+            if len(keys) >= 500:
+                deleted += client.delete(*keys)
+                keys = []
+        if keys:
+            deleted += client.delete(*keys)
+    except redis.RedisError as e:
+        _on_redis_error("清除缓存", e)
+
+    return deleted
+
+
+def skip_cache():
+    """标记当前请求的响应不写入缓存，供以HTTP 200返回错误信息的接口使用"""
+    g.skip_response_cache = True
+
+
+def _build_cache_key():
+    """根据请求路径和排序后的查询参数构建缓存键"""
+    query = urlencode(sorted(request.args.items(multi=True)))
+    return f"{Config.CACHE_KEY_PREFIX}:{request.path}?{query}"
+
+
+def _is_cacheable(response):
+    """只缓存成功的JSON响应：状态码200、JSON类型且接口未调用skip_cache()"""
+    return (response.status_code == 200
+            and response.mimetype == 'application/json'
+            and not g.get('skip_response_cache', False))
+
+
+def cached(ttl=None):
+    """接口响应缓存装饰器"""
+
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(*args, **kwargs):
+            client = get_redis_client()
+            if client is None:
+                return view_func(*args, **kwargs)
+
+            cache_key = _build_cache_key()
+            try:
+                hit = client.get(cache_key)
+                if hit is not None:
+                    return Response(hit, mimetype='application/json')
+            except redis.RedisError as e:
+                _on_redis_error("读取缓存", e)
+                return view_func(*args, **kwargs)
+
+            response = view_func(*args, **kwargs)
+
+            if isinstance(response, Response) and _is_cacheable(response):
+                try:
+                    client.setex(cache_key, ttl or Config.CACHE_TTL_SECONDS, response.get_data())
+                except redis.RedisError as e:
+                    _on_redis_error("写入缓存", e)
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -9,22 +9,67 @@ from pathlib import Path
 from loguru import logger
 
 
+class _NotifyingConfigParser(configparser.ConfigParser):
+    """修改配置（set、remove_option、remove_section）时调用on_change的ConfigParser"""
+
+    def __init__(self, on_change):
+        super().__init__()
+        self._on_change = on_change
+
+    def set(self, section, option, value=None):
+        super().set(section, option, value)
+        self._on_change()
+
+    def remove_option(self, section, option):
+        removed = super().remove_option(section, option)
+        self._on_change()
+        return removed
+
+    def remove_section(self, section):
+        removed = super().remove_section(section)
+        self._on_change()
+        return removed
+
+
 class Config:
     """配置管理类"""
 
     def __init__(self, config_file='config.ini'):
         self.config_file = config_file
-        self.config = configparser.ConfigParser()
+        self._raw = None  # {节: {键: 值}}，一次完成插值的配置快照；为None时在下次读取时重建
+        self._cache = {}  # 解析后的配置值缓存，配置重新加载或修改时清空
+        # self.config仍是配置的来源，通过它修改配置会使快照和缓存失效
+        self.config = _NotifyingConfigParser(self._invalidate)
         self.load_config()
 
     def load_config(self):
         """加载配置文件"""
+        self._cache.clear()
         if os.path.exists(self.config_file):
             self.config.read(self.config_file, encoding='utf-8')
             logger.info(f"配置文件 {self.config_file} 加载成功")
+            self._build_snapshot()
         else:
             self.create_default_config()
 
+    def _build_snapshot(self):
+        """将configparser中的配置一次性转为普通嵌套dict，后续读取不再经过configparser"""
+        self._raw = {section: dict(self.config.items(section)) for section in self.config.sections()}
+        self._cache.clear()
+
+    def _invalidate(self):
+        """配置被修改：丢弃快照和解析缓存，下次读取时重建"""
+        self._raw = None
+        self._cache.clear()
+
+    def _snapshot(self):
+        """返回当前配置快照，修改后首次读取时重建"""
+        raw = self._raw
+        if raw is None:
+            self._build_snapshot()
+            raw = self._raw
+        return raw
+
     def create_default_config(self):
         """创建默认配置文件"""
         self.config['database'] = {
@@ -32,7 +77,9 @@ class Config:
             'port': '3306',
             'user': 'root',
             'password': 'your_password',
-            'database': 'stock_analysis'
+            'database': 'stock_analysis',
+            'local_infile': 'False',
+            'partition_basic_tables': 'False'
         }
 
         self.config['data_path'] = {
@@ -72,22 +119,46 @@ class Config:
             'update_interval_minutes': '5'
         }
 
+        self._build_snapshot()
+
         # 保存配置文件
         with open(self.config_file, 'w', encoding='utf-8') as f:
             self.config.write(f)
         logger.info(f"默认配置文件 {self.config_file} 创建成功")
 
+    def _cached(self, cache_key, loader):
+        """返回缓存的配置值，首次访问时调用loader解析（解析出错时不缓存）"""
+        try:
+            return self._cache[cache_key]
+        except KeyError:
+            value = self._cache[cache_key] = loader()
+            return value
+
     def get(self, section, key, fallback=None):
         """获取配置值"""
-        return self.config.get(section, key, fallback=fallback)
+        return self._snapshot().get(section, {}).get(key, fallback)
 
     def getint(self, section, key, fallback=None):
         """获取整数配置值"""
-        return self.config.getint(section, key, fallback=fallback)
+        value = self._snapshot().get(section, {}).get(key)
+        if value is None:
+            return fallback
+        return self._cached(('getint', section, key), lambda: int(value))
 
     def getboolean(self, section, key, fallback=None):
         """获取布尔配置值"""
-        return self.config.getboolean(section, key, fallback=fallback)
+        value = self._snapshot().get(section, {}).get(key)
+        if value is None:
+            return fallback
+        return self._cached(('getboolean', section, key), lambda: self._to_boolean(value))
+
+    @staticmethod
+    def _to_boolean(value):
+        """与ConfigParser.getboolean相同的转换规则，无法识别的值抛出ValueError"""
+        try:
+            return configparser.ConfigParser.BOOLEAN_STATES[value.lower()]
+        except KeyError:
+            raise ValueError(f"Not a boolean: {value}") from None
 
     def get_data_path(self, data_type):
         """获取数据路径"""
@@ -97,13 +168,17 @@ class Config:
 
     def get_periods(self):
         """获取支持的周期列表"""
-        periods_str = self.get('stock', 'periods', 'daily')
-        return [p.strip() for p in periods_str.split(',')]
+        periods = self._cached('periods', lambda: tuple(
+            p.strip() for p in self.get('stock', 'periods', 'daily').split(',')
+        ))
+        return list(periods)
 
     def get_market_codes(self):
         """获取支持的市场代码列表"""
-        codes_str = self.get('stock', 'market_codes', 'sh,sz')
-        return [c.strip() for c in codes_str.split(',')]
+        codes = self._cached('market_codes', lambda: tuple(
+            c.strip() for c in self.get('stock', 'market_codes', 'sh,sz').split(',')
+        ))
+        return list(codes)
 
     def get_data_fetch_timeout(self):
         """获取数据获取超时时间"""
@@ -113,6 +188,10 @@ class Config:
         """获取最大重试次数"""
         return self.getint('data_fetch', 'max_retries', 3)
 
+    def get_max_workers(self):
+        """获取批量获取数据时的并发线程数"""
+        return self.getint('data_fetch', 'max_workers', 10)
+
     def get_retry_delay(self):
         """获取重试延迟时间"""
         return self.getint('data_fetch', 'retry_delay', 2)
@@ -140,7 +219,7 @@ class Config:
     def getfloat(self, section, key, fallback=None):
         """获取浮点数配置值"""
         try:
-            return self.config.getfloat(section, key)
+            return self._cached(('getfloat', section, key), lambda: float(self._snapshot()[section][key]))
         except (ValueError, KeyError):
             return fallback
 
@@ -0,0 +1,30 @@
+"""
+gunicorn生产部署配置
+启动方式: gunicorn -c core/gunicorn_conf.py core.app:app
+"""
+
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.app_config import Config
+
+# 监听地址
+bind = f"{Config.FLASK_HOST}:{Config.FLASK_PORT}"
+
+# 多进程 + 每进程多线程，重叠数据库和数据源请求的I/O等待
+workers = Config.GUNICORN_WORKERS
+worker_class = 'gthread'
+threads = Config.GUNICORN_THREADS
+
+# 数据源请求可能较慢，放宽超时时间
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# 日志输出到标准输出
+accesslog = '-'
+errorlog = '-'
+loglevel = Config.LOG_LEVEL.lower()
@@ -0,0 +1,94 @@
+"""
+接口响应工具模块
+提供DataFrame到JSON响应的快速序列化
+"""
+
+import json
+from flask import Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """基于orjson的JSON序列化，支持numpy类型，NaN输出为null
+
+    date/datetime仍交给Flask的default处理，与默认实现一样输出HTTP日期格式；
+    sort_keys、indent参数映射为orjson的对应选项（orjson只支持2空格缩进），非ASCII字符不转义
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+
+
+def init_json_provider(app):
+    """安装了orjson时，将应用的JSON序列化切换为orjson"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+
+def _meta_fields(meta):
+    """将顶层字段序列化为JSON键值片段"""
+    return [
+        f'{json.dumps(key)}:{json.dumps(value, ensure_ascii=False, default=str)}'
+        for key, value in meta.items()
+    ]
+
+
+def _records_json(df):
+    """将DataFrame序列化为JSON记录数组"""
+    return df.to_json(orient="records", date_format="iso", force_ascii=False)
+
+
+def df_response(df, **meta):
+    """将DataFrame直接序列化为JSON响应，data字段为记录列表，其余关键字参数作为顶层字段"""
+    fields = _meta_fields(meta)
+    fields.append(f'"data":{_records_json(df)}')
+    return Response('{' + ','.join(fields) + '}', mimetype='application/json')
+
+
+def df_columns_response(df, **meta):
+    """将DataFrame按列序列化为JSON响应，data字段为 {列名: [值, ...]}，适合图表按序列读取"""
+    columns = ','.join(
+        f'{json.dumps(col, ensure_ascii=False)}:'
+        f'{df[col].to_json(orient="values", date_format="iso", force_ascii=False)}'
+        for col in df.columns
+    )
+    fields = _meta_fields(meta)
+    fields.append(f'"data":{{{columns}}}')
+    return Response('{' + ','.join(fields) + '}', mimetype='application/json')
+
+
+def df_stream_response(chunks, **meta):
+    """流式输出JSON响应，chunks为按块产出DataFrame的可迭代对象，适用于分笔数据等大结果集
+
+    响应头已发出后读取出错时中止响应：不输出结尾的 ]} 并断开连接，客户端得到不完整的JSON，
+    而不是看似完整但被截断的数据
+    """
+
+    def generate():
+        yield '{' + ''.join(f'{field},' for field in _meta_fields(meta)) + '"data":['
+        first = True
+        try:
+            for chunk in chunks:
+                if chunk.empty:
+                    continue
+                records = _records_json(chunk)[1:-1]  # 去掉外层方括号
+                yield records if first else ',' + records
+                first = False
+        except Exception as e:
+            logger.error(f"流式输出数据中断，已中止响应: {e}")
+            raise
+        yield ']}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
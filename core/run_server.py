@@ -18,6 +18,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import configparser
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 from core.config import config
+from core.response import init_json_provider
 from utils.indicator_api import indicator_api
 from export.export_api import export_api
 
@@ -28,6 +29,9 @@ def create_app():
     # 配置CORS
     CORS(app)
 
+    # 使用orjson序列化JSON响应
+    init_json_provider(app)
+
     # 注册蓝图
     app.register_blueprint(indicator_api)
     app.register_blueprint(export_api)
@@ -70,7 +74,7 @@ def main():
         logger.info(f"启动服务器: {host}:{port}, 调试模式: {debug}")
 
         # 启动服务器
-        app.run(host=host, port=port, debug=debug)
+        app.run(host=host, port=port, debug=debug, threaded=True)
 
     except KeyboardInterrupt:
         logger.info("服务器被用户中断")
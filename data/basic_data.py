@@ -11,12 +11,48 @@ from datetime import datetime, date, timedelta
 import os
 import time
 import threading
-import queue
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional, Any, Callable
 from loguru import logger
+from sqlalchemy import text
 from .database import db_manager
 from core.config import config
+from analysis._kernels import price_indicators
+from data.http_session import install_shared_session, run_with_timeout, RETRY_ON, backoff_delay
+from data.basic_data_cache import BasicDataCache
+
+# akshare原始列名 -> 标准列名
+COLUMN_MAPPING = {
+    '日期': 'trade_date', '时间': 'trade_date', '开盘': 'open_price',
+    '收盘': 'close_price', '最高': 'high_price', '最低': 'low_price',
+    '成交量': 'volume', '成交额': 'amount', '振幅': 'amplitude',
+    '涨跌幅': 'change_pct', '涨跌额': 'change_price', '换手率': 'turnover_rate'
+}
+
+# 需要转换为数值的列
+NUMERIC_COLUMNS = ('open_price', 'close_price', 'high_price', 'low_price', 'volume', 'amount',
+                   'change_price', 'change_pct', 'turnover_rate')
+
+# 基础数据表的数据列（不含自增id和时间戳列），查询和入库都只使用这些列
+BASIC_COLUMNS = ('stock_code', 'trade_date', 'trade_time', 'open_price', 'close_price', 'high_price',
+                 'low_price', 'volume', 'amount', 'change_price', 'change_pct', 'turnover_rate')
+
+# 数据源连续失败后的冷却时间上限（秒），冷却时间随连续失败次数指数增长
+SOURCE_MAX_COOLDOWN = 300
+
+# akshare分钟线接口支持的周期
+MINUTE_PERIODS = frozenset({'1min', '5min', '15min', '30min', '60min'})
+
+# 系统周期 -> akshare日线接口的period参数
+AK_PERIOD_MAPPING = {'daily': 'daily', 'week': 'weekly', 'month': 'monthly'}
+
+
+def _downcast(data):
+    """压缩成交量列类型，尽量用整数（原地修改并返回）；价格保持float64，避免返回给接口的值带上float32的舍入误差"""
+    if 'volume' in data.columns:
+        data['volume'] = pd.to_numeric(data['volume'], downcast='integer')
+    return data
 
 
 class BasicData:
@@ -28,6 +64,14 @@ class BasicData:
         self.timeout = timeout  # 超时时间（秒）
         self.max_retries = max_retries  # 最大重试次数
 
+        # akshare的HTTP请求复用长连接
+        install_shared_session()
+
+        self._statements = {}  # {(周期, 查询类型, 是否有起始日期, 是否有结束日期): text语句}
+
+        # 数据源返回结果的Parquet缓存，重复获取时只请求缓存未覆盖的区间
+        self.fetch_cache = BasicDataCache(Path(self.data_path) / 'cache')
+
         # 定义多个数据源的获取方法
         self.data_sources = {
             'akshare_primary': self._akshare_primary_source,
@@ -38,70 +82,86 @@ class BasicData:
         # 数据源优先级
         self.source_priority = ['akshare_primary', 'akshare_backup', 'akshare_alternative']
 
-    def _with_timeout(self, func: Callable, *args, **kwargs) -> Any:
-        """为函数添加超时机制"""
-        result_queue = queue.Queue()
-        exception_queue = queue.Queue()
-
-        def target():
-            try:
-                result = func(*args, **kwargs)
-                result_queue.put(result)
-            except Exception as e:
-                exception_queue.put(e)
-
-        thread = threading.Thread(target=target)
-        thread.daemon = True
-        thread.start()
-        thread.join(timeout=self.timeout)
+        # 按优先级预先解析好的 (数据源名称, 获取方法)，重试循环直接遍历
+        self._source_chain = tuple((name, self.data_sources[name]) for name in self.source_priority)
 
-        if thread.is_alive():
-            logger.warning(f"函数 {func.__name__} 执行超时 ({self.timeout}秒)")
-            raise TimeoutError(f"函数执行超时: {self.timeout}秒")
+        # 数据源健康状态：连续失败的数据源在冷却期内跳过，避免反复等待已失效的接口超时
+        self._source_health = {name: {'fails': 0, 'cooldown_until': 0.0} for name in self.source_priority}
+        self._health_lock = threading.Lock()
 
-        if not exception_queue.empty():
-            raise exception_queue.get()
-
-        if not result_queue.empty():
-            return result_queue.get()
-
-        raise Exception("函数执行失败，无返回结果")
+    def _with_timeout(self, func: Callable, *args, **kwargs) -> Any:
+        """为函数添加超时机制，在共享取数线程池中执行"""
+        return run_with_timeout(func, self.timeout, *args, **kwargs)
 
     def _try_multiple_sources(self, stock_code: str, period: str, start_date: str, end_date: str, adjust: str) -> pd.DataFrame:
         """尝试多个数据源获取数据"""
         last_error = None
 
-        for source_name in self.source_priority:
+        for source_name, source_func in self._available_sources():
+            failed = False
+
             for attempt in range(self.max_retries):
                 try:
-                    logger.info(f"尝试使用数据源 {source_name} 获取股票 {stock_code} {period} 周期数据 (第{attempt+1}次尝试)")
+                    logger.debug("尝试使用数据源 {} 获取股票 {} {} 周期数据 (第{}次尝试)", source_name, stock_code, period, attempt + 1)
 
-                    source_func = self.data_sources[source_name]
                     result = self._with_timeout(source_func, stock_code, period, start_date, end_date, adjust)
 
                     if not result.empty:
+                        self._record_source_result(source_name, True)
                         logger.success(f"使用数据源 {source_name} 成功获取股票 {stock_code} {period} 周期数据")
                         return result
-                    else:
-                        logger.warning(f"数据源 {source_name} 返回空数据")
 
-                except TimeoutError as e:
-                    logger.warning(f"数据源 {source_name} 超时: {e}")
+                    # 空数据不是临时错误，不再重试同一数据源，直接切换下一个
+                    logger.warning(f"数据源 {source_name} 返回空数据")
+                    failed = False
+                    break
+
+                except RETRY_ON as e:
+                    logger.warning(f"数据源 {source_name} 请求失败: {e}")
                     last_error = e
-                    time.sleep(1)  # 短暂延迟后重试
+                    failed = True
+                    if attempt < self.max_retries - 1:
+                        time.sleep(backoff_delay(attempt))  # 指数退避后重试
 
                 except Exception as e:
+                    # 非网络错误（如接口返回格式变化）重试结果相同，直接切换下一个数据源
                     logger.error(f"数据源 {source_name} 错误: {e}")
                     last_error = e
-                    if attempt < self.max_retries - 1:
-                        time.sleep(2)  # 延迟后重试
+                    failed = True
+                    break
+
+            if failed:
+                self._record_source_result(source_name, False)
 
         logger.error(f"所有数据源均失败，最后错误: {last_error}")
         raise Exception(f"所有数据源均失败: {last_error}")
 
+    def _available_sources(self):
+        """按优先级返回不在冷却期内的数据源；全部处于冷却期时仍返回所有数据源，避免请求直接失败"""
+        now = time.monotonic()
+        available = tuple(
+            (name, func) for name, func in self._source_chain
+            if self._source_health[name]['cooldown_until'] <= now
+        )
+        return available or self._source_chain
+
+    def _record_source_result(self, source_name, success):
+        """记录数据源的请求结果：成功时清零失败计数，失败时按连续失败次数设置冷却期"""
+        with self._health_lock:
+            health = self._source_health[source_name]
+            if success:
+                health['fails'] = 0
+                health['cooldown_until'] = 0.0
+            else:
+                health['fails'] += 1
+                health['cooldown_until'] = time.monotonic() + min(SOURCE_MAX_COOLDOWN, 2 ** health['fails'])
+                if health['fails'] > 1:
+                    logger.warning(f"数据源 {source_name} 连续失败 {health['fails']} 次，暂停使用 "
+                                   f"{min(SOURCE_MAX_COOLDOWN, 2 ** health['fails'])} 秒")
+
     def _akshare_primary_source(self, stock_code: str, period: str, start_date: str, end_date: str, adjust: str) -> pd.DataFrame:
         """主要数据源 - akshare 默认接口"""
-        if period in ['1min', '5min', '15min', '30min', '60min']:
+        if period in MINUTE_PERIODS:
             stock_data = ak.stock_zh_a_hist_min_em(
                 symbol=stock_code,
                 start_date=start_date,
@@ -110,8 +170,7 @@ class BasicData:
                 adjust=adjust
             )
         else:
-            period_mapping = {'daily': 'daily', 'week': 'weekly', 'month': 'monthly'}
-            ak_period = period_mapping.get(period, 'daily')
+            ak_period = AK_PERIOD_MAPPING.get(period, 'daily')
             stock_data = ak.stock_zh_a_hist(
                 symbol=stock_code,
                 period=ak_period,
@@ -128,7 +187,7 @@ class BasicData:
     def _akshare_backup_source(self, stock_code: str, period: str, start_date: str, end_date: str, adjust: str) -> pd.DataFrame:
         """备用数据源 - akshare 腾讯接口"""
         try:
-            if period in ['1min', '5min', '15min', '30min', '60min']:
+            if period in MINUTE_PERIODS:
                 # 对于分钟级数据，回退到日级数据
                 stock_data = ak.stock_zh_a_hist_tx(
                     symbol=stock_code,
@@ -146,8 +205,9 @@ class BasicData:
                 stock_data = self._standardize_columns(stock_data, stock_code, period)
 
             return stock_data
-        except:
-            # 如果腾讯接口失败，尝试网易接口
+        except RETRY_ON as e:
+            # 腾讯接口网络错误或超时时改用网易接口；其他异常（如接口返回列变化）直接抛出
+            logger.debug("腾讯接口获取股票 {} 数据失败，改用网易接口: {}", stock_code, e)
             stock_data = ak.stock_zh_a_hist_163(
                 symbol=stock_code,
                 start_date=start_date,
@@ -163,7 +223,7 @@ class BasicData:
         """替代数据源 - 其他接口或生成模拟数据"""
         try:
             # 尝试使用新浪接口
-            if period in ['1min', '5min', '15min', '30min', '60min']:
+            if period in MINUTE_PERIODS:
                 # 对于分钟级数据，生成基于日级数据的模拟分钟数据
                 daily_data = ak.stock_zh_a_hist(
                     symbol=stock_code,
@@ -174,10 +234,8 @@ class BasicData:
                 )
 
                 if not daily_data.empty:
-                    # 简化处理：复制日级数据作为分钟级数据
-                    stock_data = daily_data.copy()
-                    stock_data = self._standardize_columns(stock_data, stock_code, period)
-                    return stock_data
+                    # 简化处理：日级数据作为分钟级数据（标准化时重命名列已生成新的DataFrame，无需先复制）
+                    return self._standardize_columns(daily_data, stock_code, period)
             else:
                 # 尝试不同的akshare接口
                 stock_data = ak.stock_zh_a_hist_pre_min_em(symbol=stock_code)
@@ -199,19 +257,23 @@ class BasicData:
             # 返回空DataFrame
             return pd.DataFrame()
 
-    def get_stock_data(self, stock_code, period='daily', start_date=None, end_date=None, adjust='qfq'):
-        """获取股票基础数据（支持超时和多数据源切换）"""
+    def get_stock_data(self, stock_code, period='daily', start_date=None, end_date=None, adjust='qfq', use_cache=True):
+        """获取股票基础数据（支持超时和多数据源切换），use_cache为False时跳过获取缓存直接请求数据源"""
         try:
             if end_date is None:
                 end_date = datetime.now().strftime('%Y%m%d')
             if start_date is None:
                 start_date = (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
 
-            # 使用多数据源切换机制
-            stock_data = self._try_multiple_sources(stock_code, period, start_date, end_date, adjust)
+            # 日/周/月线走获取缓存；分钟线的trade_date只保留日期，无法按日期补齐缺口
+            if use_cache and self.fetch_cache.enabled and period in AK_PERIOD_MAPPING:
+                stock_data = self._get_stock_data_cached(stock_code, period, start_date, end_date, adjust)
+            else:
+                # 使用多数据源切换机制
+                stock_data = self._try_multiple_sources(stock_code, period, start_date, end_date, adjust)
 
             if not stock_data.empty:
-                logger.info(f"获取股票 {stock_code} {period} 周期数据成功，共 {len(stock_data)} 条")
+                logger.debug("获取股票 {} {} 周期数据成功，共 {} 条", stock_code, period, len(stock_data))
                 return stock_data
             else:
                 logger.warning(f"股票 {stock_code} {period} 周期无数据")
@@ -221,37 +283,103 @@ class BasicData:
             logger.error(f"获取股票 {stock_code} {period} 周期数据失败: {e}")
             return pd.DataFrame()
 
+    def _get_stock_data_cached(self, stock_code, period, start_date, end_date, adjust):
+        """先读取获取缓存，只向数据源请求缓存未覆盖的头部/尾部区间，合并后写回缓存"""
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        cached, covered_start = self.fetch_cache.load(stock_code, period, adjust)
+
+        if cached is None:
+            stock_data = self._try_multiple_sources(stock_code, period, start_date, end_date, adjust)
+            self.fetch_cache.save(stock_data, stock_code, period, adjust, start)
+            return stock_data
+
+        cached_end = cached['trade_date'].max()
+        frames = [cached]
+
+        # 缺口请求都包含与缓存重叠的一天，用于检查复权价格是否因除权除息而变化；
+        # 缺口获取失败（无交易数据或网络错误）时只使用缓存中已有的数据
+        if start < covered_start:
+            head = self._fetch_gap(stock_code, period, start_date, covered_start.strftime('%Y%m%d'), adjust)
+            if head is not None:
+                frames.insert(0, head)
+                covered_start = start
+
+        # 最新一根K线可能尚未收盘，缓存到今天时也重新获取
+        if end > cached_end or cached_end >= pd.Timestamp.now().normalize():
+            tail = self._fetch_gap(stock_code, period, cached_end.strftime('%Y%m%d'), end_date, adjust)
+            if tail is not None:
+                frames.append(tail)
+
+        if len(frames) == 1:
+            return self._slice_dates(cached, start, end)
+
+        if any(self._adjustment_changed(cached, frame) for frame in frames if frame is not cached):
+            logger.info(f"股票 {stock_code} {period} 周期复权价格已变化，重新获取缓存区间的完整数据")
+            stock_data = self._try_multiple_sources(
+                stock_code, period, covered_start.strftime('%Y%m%d'), max(end, cached_end).strftime('%Y%m%d'), adjust)
+        else:
+            stock_data = (pd.concat(frames, ignore_index=True)
+                          .drop_duplicates('trade_date', keep='last')
+                          .sort_values('trade_date', ignore_index=True))
+
+        self.fetch_cache.save(stock_data, stock_code, period, adjust, covered_start)
+        return self._slice_dates(stock_data, start, end)
+
+    def _fetch_gap(self, stock_code, period, start_date, end_date, adjust):
+        """获取缓存未覆盖的区间，区间内没有数据或所有数据源均失败时返回None"""
+        try:
+            return self._try_multiple_sources(stock_code, period, start_date, end_date, adjust)
+        except Exception as e:
+            logger.warning(f"获取股票 {stock_code} {period} 周期 {start_date}-{end_date} 缺口数据失败，使用缓存数据: {e}")
+            return None
+
+    @staticmethod
+    def _adjustment_changed(cached, fetched):
+        """比较缓存与新获取数据重叠日期的收盘价，不一致说明复权基准已变化"""
+        if fetched.empty or 'close_price' not in fetched.columns:
+            return False
+
+        overlap = fetched[['trade_date', 'close_price']].merge(
+            cached[['trade_date', 'close_price']], on='trade_date', suffixes=('', '_cached'))
+        return not np.allclose(overlap['close_price'], overlap['close_price_cached'], rtol=1e-4, equal_nan=True)
+
+    @staticmethod
+    def _slice_dates(data, start, end):
+        """截取 [start, end] 日期区间的数据"""
+        return data[(data['trade_date'] >= start) & (data['trade_date'] <= end)].reset_index(drop=True)
+
     def _standardize_columns(self, data, stock_code, period):
         """标准化基础数据列名"""
         try:
-            column_mapping = {
-                '日期': 'trade_date', '时间': 'trade_date', '开盘': 'open_price',
-                '收盘': 'close_price', '最高': 'high_price', '最低': 'low_price',
-                '成交量': 'volume', '成交额': 'amount', '振幅': 'amplitude',
-                '涨跌幅': 'change_pct', '涨跌额': 'change_price', '换手率': 'turnover_rate'
-            }
-
-            for old_col, new_col in column_mapping.items():
-                if old_col in data.columns:
-                    data = data.rename(columns={old_col: new_col})
+            # 一次重命名所有列，不存在的列名会被忽略
+            data = data.rename(columns=COLUMN_MAPPING)
 
             data['stock_code'] = stock_code
             data['period_type'] = period
 
             if 'trade_date' in data.columns:
-                data['trade_date'] = pd.to_datetime(data['trade_date']).dt.date
+                # 保持为datetime64（只保留日期部分），不转换为逐行的Python date对象
+                data['trade_date'] = pd.to_datetime(data['trade_date']).dt.normalize()
 
-            numeric_columns = ['open_price', 'close_price', 'high_price', 'low_price', 'volume', 'amount',
-                               'change_price', 'change_pct', 'turnover_rate']
-            for col in numeric_columns:
-                if col in data.columns:
-                    data[col] = pd.to_numeric(data[col], errors='coerce')
+            # 数据源返回的列大多已是数值类型，只转换仍为object等非数值类型的列
+            numeric_columns = [col for col in NUMERIC_COLUMNS
+                               if col in data.columns and not pd.api.types.is_numeric_dtype(data[col])]
+            if numeric_columns:
+                data[numeric_columns] = data[numeric_columns].apply(pd.to_numeric, errors='coerce')
 
             if 'change_price' not in data.columns and 'open_price' in data.columns and 'close_price' in data.columns:
-                data['change_price'] = data['close_price'] - data['open_price']
+                data['change_price'] = np.subtract(data['close_price'].to_numpy(dtype=np.float64, na_value=np.nan),
+                                                   data['open_price'].to_numpy(dtype=np.float64, na_value=np.nan))
 
             if 'change_pct' not in data.columns and 'change_price' in data.columns and 'open_price' in data.columns:
-                data['change_pct'] = (data['change_price'] / data['open_price']) * 100
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    data['change_pct'] = np.divide(data['change_price'].to_numpy(dtype=np.float64, na_value=np.nan),
+                                                   data['open_price'].to_numpy(dtype=np.float64, na_value=np.nan)) * 100
+
+            # 压缩列类型，代码和周期用分类类型
+            data = _downcast(data)
+            data['stock_code'] = data['stock_code'].astype('category')
+            data['period_type'] = data['period_type'].astype('category')
 
             return data
 
@@ -266,26 +394,16 @@ class BasicData:
             return
 
         try:
-            # 更新列名，移除period_type，因为周期信息已经在表名中
-            columns = ['stock_code', 'trade_date', 'trade_time', 'open_price', 'close_price', 'high_price',
-                       'low_price', 'volume', 'amount', 'change_price', 'change_pct', 'turnover_rate']
-
-            # 确保所有列都存在
-            for col in columns:
-                if col not in basic_data.columns:
-                    if col == 'trade_time':
-                        basic_data[col] = None  # 对于分钟级数据会有具体时间
-                    else:
-                        basic_data[col] = None
-
             # 按周期分组保存到不同的表
             if 'period_type' in basic_data.columns:
-                for period, group_data in basic_data.groupby('period_type'):
-                    db_data = group_data[columns].copy()
-
-                    # 使用新的动态表插入方法
-                    success = db_manager.insert_dataframe_to_dynamic_table(
-                        db_data, 'basic', period, if_exists='append'
+                # 一次选出入库列，缺失的列补为空值（trade_time对于分钟级数据会有具体时间），不修改传入的数据
+                data = basic_data.reindex(columns=list(BASIC_COLUMNS))
+
+                for period, db_data in data.groupby(basic_data['period_type'], observed=True):
+                    # 按 (stock_code, trade_date) 唯一键写入，重复保存同一段数据不会因主键冲突失败
+                    table_name = db_manager.create_basic_data_table(period)
+                    success = table_name is not None and db_manager.upsert_dataframe(
+                        db_data, table_name, ['stock_code', 'trade_date']
                     )
                     if success:
                         logger.info(f"成功保存 {len(db_data)} 条基础数据到表 {db_manager.get_basic_table_name(period)}")
@@ -297,42 +415,48 @@ class BasicData:
         except Exception as e:
             logger.error(f"保存基础数据到数据库失败: {e}")
 
+    def _basic_statement(self, period, kind, has_start=False, has_end=False):
+        """按周期构造并缓存单只股票的查询语句：range为按日期区间查询，latest为最新一条"""
+        key = (period, kind, has_start, has_end)
+        statement = self._statements.get(key)
+
+        if statement is None:
+            sql = (f"SELECT {', '.join(BASIC_COLUMNS)} FROM {db_manager.get_basic_table_name(period)} "
+                   "WHERE stock_code = :stock_code")
+
+            if kind == 'latest':
+                sql += " ORDER BY trade_date DESC LIMIT 1"
+            else:
+                if has_start:
+                    sql += " AND trade_date >= :start_date"
+                if has_end:
+                    sql += " AND trade_date <= :end_date"
+                sql += " ORDER BY trade_date"
+
+            statement = self._statements[key] = text(sql)
+
+        return statement
+
     def get_basic_data_from_db(self, stock_code, period='daily', start_date=None, end_date=None):
-        """从数据库获取基础数据（从按周期分表中查询）"""
+        """从按周期分表中获取基础数据"""
         try:
             table_name = db_manager.get_basic_table_name(period)
 
             # 检查表是否存在
-            check_sql = f"""
-            SELECT COUNT(*) as count FROM information_schema.tables
-            WHERE table_schema = DATABASE() AND table_name = '{table_name}'
-            """
-            table_exists = db_manager.query_to_dataframe(check_sql)
-
-            if table_exists.empty or table_exists.iloc[0]['count'] == 0:
+            if not db_manager.table_exists(table_name):
                 logger.warning(f"表 {table_name} 不存在")
                 return pd.DataFrame()
 
-            sql = f"SELECT * FROM {table_name} WHERE stock_code = :stock_code"
-            params = {'stock_code': stock_code}
+            sql = self._basic_statement(period, 'range', bool(start_date), bool(end_date))
+            params = {'stock_code': stock_code, 'start_date': start_date, 'end_date': end_date}
 
-            if start_date:
-                sql += " AND trade_date >= :start_date"
-                params['start_date'] = start_date
-
-            if end_date:
-                sql += " AND trade_date <= :end_date"
-                params['end_date'] = end_date
-
-            sql += " ORDER BY trade_date"
-
-            basic_data = db_manager.query_to_dataframe(sql, params)
+            basic_data = _downcast(db_manager.query_to_dataframe(sql, params, stream=True))
 
             # 添加period_type列以保持向后兼容
             if not basic_data.empty:
                 basic_data['period_type'] = period
 
-            logger.info(f"从数据库获取股票 {stock_code} {period} 周期基础数据成功，共 {len(basic_data)} 条")
+            logger.debug("从数据库获取股票 {} {} 周期基础数据成功，共 {} 条", stock_code, period, len(basic_data))
             return basic_data
 
         except Exception as e:
@@ -347,23 +471,15 @@ class BasicData:
         try:
             updated_data = {}
 
+            # 一次查询各周期已有数据的最新交易日期
+            latest_dates = {} if force_update else self.get_latest_dates(stock_code, periods)
+
             for period in periods:
                 try:
-                    if not force_update:
-                        existing_data = self.get_basic_data_from_db(stock_code, period)
-                        if not existing_data.empty:
-                            latest_date = existing_data['trade_date'].max()
-                            if latest_date >= datetime.now().date():
-                                logger.info(f"股票 {stock_code} {period} 周期数据已是最新，跳过更新")
-                                continue
-
-                    # 使用提供的start_date参数，如果没有则使用默认逻辑
-                    if start_date:
-                        new_data = self.get_stock_data(stock_code, period, start_date=start_date)
-                    else:
-                        new_data = self.get_stock_data(stock_code, period)
+                    new_data = self._fetch_update_data(stock_code, period, latest_dates.get(period), start_date,
+                                                       use_cache=not force_update)
 
-                    if not new_data.empty:
+                    if new_data is not None and not new_data.empty:
                         self.save_basic_data_to_db(new_data)
                         updated_data[period] = new_data
                         logger.info(f"股票 {stock_code} {period} 周期数据更新成功")
@@ -378,40 +494,194 @@ class BasicData:
             logger.error(f"更新基础数据失败: {e}")
             return {}
 
-    def get_latest_data(self, stock_code, period='daily'):
-        """获取最新的基础数据"""
+    def update_many(self, stock_codes, periods=None, force_update=False, start_date=None, max_workers=None,
+                    errors=None):
+        """并发更新多只股票的基础数据，返回 {股票代码: {周期: 新数据}}
+
+        每个 (股票, 周期) 的网络请求提交到线程池并发执行，获取完成后每个周期只批量入库一次；
+        传入errors字典时，获取失败的任务以 {(股票代码, 周期): 错误信息} 写入其中
+        """
+        if periods is None:
+            periods = self.periods
+        if max_workers is None:
+            # 每个请求还要占用共享取数线程池中的一个线程，并发数不宜超过FETCH_WORKERS
+            max_workers = config.get_max_workers()
+
+        updated_data = {}
+
+        try:
+            # 每个周期用一条SQL查出所有股票已有数据的最新交易日期，不再逐只股票查询
+            latest_dates = {} if force_update else {
+                period: self.get_latest_dates_by_stock(stock_codes, period) for period in periods
+            }
+
+            def fetch(stock_code, period):
+                return self._fetch_update_data(stock_code, period, latest_dates.get(period, {}).get(stock_code),
+                                               start_date, use_cache=not force_update)
+
+            fetched = {period: [] for period in periods}
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_to_task = {
+                    executor.submit(fetch, stock_code, period): (stock_code, period)
+                    for stock_code in stock_codes
+                    for period in periods
+                }
+
+                for future in as_completed(future_to_task):
+                    stock_code, period = future_to_task[future]
+                    try:
+                        new_data = future.result()
+                    except Exception as e:
+                        logger.error(f"更新股票 {stock_code} {period} 周期数据失败: {e}")
+                        if errors is not None:
+                            errors[(stock_code, period)] = str(e)
+                        continue
+
+                    if new_data is not None and not new_data.empty:
+                        fetched[period].append(new_data)
+                        updated_data.setdefault(stock_code, {})[period] = new_data
+
+            for period, frames in fetched.items():
+                if frames:
+                    self.save_basic_data_to_db(pd.concat(frames, ignore_index=True))
+
+            logger.info(f"批量更新基础数据完成，{len(updated_data)}/{len(stock_codes)} 只股票有新数据")
+            return updated_data
+
+        except Exception as e:
+            logger.error(f"批量更新基础数据失败: {e}")
+            return updated_data
+
+    def _fetch_update_data(self, stock_code, period, latest_date, start_date=None, use_cache=True):
+        """获取单只股票单个周期需要更新的数据，已是最新时返回None"""
+        if latest_date is not None and pd.Timestamp(latest_date).date() >= datetime.now().date():
+            logger.info(f"股票 {stock_code} {period} 周期数据已是最新，跳过更新")
+            return None
+
+        # 使用提供的start_date参数；已有数据时只从最新交易日开始增量获取（重叠的一天由写入时更新）；
+        # 否则使用默认逻辑。force_update时不查询已有数据，重新获取完整区间以刷新复权价格
+        if start_date:
+            return self.get_stock_data(stock_code, period, start_date=start_date, use_cache=use_cache)
+        elif latest_date is not None:
+            return self.get_stock_data(stock_code, period, start_date=pd.Timestamp(latest_date).strftime('%Y%m%d'),
+                                       use_cache=use_cache)
+        else:
+            return self.get_stock_data(stock_code, period, use_cache=use_cache)
+
+    def get_latest_dates(self, stock_code, periods):
+        """用一条SQL获取股票在各周期表中的最新交易日期，返回 {周期: 日期}，无数据的周期不包含在内"""
+        if not periods:
+            return {}
+
+        try:
+            table_names = {period: db_manager.get_basic_table_name(period) for period in periods}
+
+            # 一次检查所有周期表是否存在（已确认存在的表不再查询）
+            existing_tables = db_manager.filter_existing_tables(list(table_names.values()))
+
+            subqueries = [
+                f"SELECT '{period}' AS period_type, MAX(trade_date) AS last_date "
+                f"FROM {table_name} WHERE stock_code = :stock_code"
+                for period, table_name in table_names.items() if table_name in existing_tables
+            ]
+            if not subqueries:
+                return {}
+
+            latest = db_manager.query_to_dataframe(' UNION ALL '.join(subqueries), {'stock_code': stock_code})
+            latest = latest.dropna(subset=['last_date'])
+            return dict(zip(latest['period_type'], latest['last_date']))
+
+        except Exception as e:
+            logger.error(f"获取股票 {stock_code} 最新交易日期失败: {e}")
+            return {}
+
+    def get_latest_dates_by_stock(self, stock_codes, period):
+        """用一条SQL获取多只股票在某周期表中的最新交易日期，返回 {股票代码: 日期}，无数据的股票不包含在内"""
+        if not stock_codes:
+            return {}
+
         try:
             table_name = db_manager.get_basic_table_name(period)
+            if not db_manager.table_exists(table_name):
+                return {}
 
-            # 检查表是否存在
-            check_sql = f"""
-            SELECT COUNT(*) as count FROM information_schema.tables
-            WHERE table_schema = DATABASE() AND table_name = '{table_name}'
+            placeholders = ','.join([f':stock_code_{i}' for i in range(len(stock_codes))])
+            sql = f"""
+            SELECT stock_code, MAX(trade_date) AS last_date FROM {table_name}
+            WHERE stock_code IN ({placeholders})
+            GROUP BY stock_code
             """
-            table_exists = db_manager.query_to_dataframe(check_sql)
+            params = {f'stock_code_{i}': code for i, code in enumerate(stock_codes)}
+
+            latest = db_manager.query_to_dataframe(sql, params)
+            if latest.empty:
+                return {}
+
+            latest = latest.dropna(subset=['last_date'])
+            return dict(zip(latest['stock_code'], latest['last_date']))
+
+        except Exception as e:
+            logger.error(f"批量获取 {period} 周期最新交易日期失败: {e}")
+            return {}
+
+    def get_batch_data_from_db(self, stock_codes, period='daily', start_date=None, end_date=None, columns=None):
+        """用一条SQL从数据库批量获取多只股票的基础数据，按股票代码和交易日期排序"""
+        if not stock_codes:
+            return pd.DataFrame()
+
+        try:
+            table_name = db_manager.get_basic_table_name(period)
 
-            if table_exists.empty or table_exists.iloc[0]['count'] == 0:
+            # 检查表是否存在
+            if not db_manager.table_exists(table_name):
                 logger.warning(f"表 {table_name} 不存在")
                 return pd.DataFrame()
 
-            sql = f"""
-            SELECT * FROM {table_name}
-            WHERE stock_code = :stock_code
-            ORDER BY trade_date DESC
-            LIMIT 1
-            """
-            params = {'stock_code': stock_code}
-            result = db_manager.query_to_dataframe(sql, params)
+            placeholders = ','.join([f':stock_code_{i}' for i in range(len(stock_codes))])
+            select_columns = ', '.join(columns or BASIC_COLUMNS)
+            sql = f"SELECT {select_columns} FROM {table_name} WHERE stock_code IN ({placeholders})"
+            params = {f'stock_code_{i}': code for i, code in enumerate(stock_codes)}
 
-            # 添加period_type列以保持向后兼容
-            if not result.empty:
+            if start_date:
+                sql += " AND trade_date >= :start_date"
+                params['start_date'] = start_date
+
+            if end_date:
+                sql += " AND trade_date <= :end_date"
+                params['end_date'] = end_date
+
+            sql += " ORDER BY stock_code, trade_date"
+
+            batch_data = _downcast(db_manager.query_to_dataframe(sql, params, stream=True))
+            logger.info(f"从数据库批量获取 {len(stock_codes)} 只股票 {period} 周期基础数据，共 {len(batch_data)} 条")
+            return batch_data
+
+        except Exception as e:
+            logger.error(f"批量获取基础数据失败: {e}")
+            return pd.DataFrame()
+
+    def get_latest_data(self, stock_code, period='daily'):
+        """获取最新一条基础数据，返回 {列名: 值}，无数据时返回None"""
+        try:
+            table_name = db_manager.get_basic_table_name(period)
+
+            # 检查表是否存在
+            if not db_manager.table_exists(table_name):
+                logger.warning(f"表 {table_name} 不存在")
+                return None
+
+            result = db_manager.query_one(self._basic_statement(period, 'latest'), {'stock_code': stock_code})
+
+            # 添加period_type以保持向后兼容
+            if result is not None:
                 result['period_type'] = period
 
             return result
 
         except Exception as e:
             logger.error(f"获取最新基础数据失败: {e}")
-            return pd.DataFrame()
+            return None
 
     def calculate_technical_indicators(self, basic_data):
         """计算基础技术指标"""
@@ -419,20 +689,40 @@ class BasicData:
             return basic_data
 
         try:
-            data = basic_data.copy()
-            data = data.sort_values('trade_date')
-
-            for window in [5, 10, 20, 60]:
-                data[f'ma_{window}'] = data['close_price'].rolling(window).mean()
+            # 数据已按日期排序时（数据库查询均带ORDER BY）不再排序；新列最后一次性拼接，无需先复制
+            if basic_data['trade_date'].is_monotonic_increasing:
+                data = basic_data
+            else:
+                data = basic_data.sort_values('trade_date', kind='mergesort')
+
+            # 一次遍历收盘价和高低价，同时计算各周期均线、涨跌幅和振幅
+            windows = [5, 10, 20, 60]
+            missing = np.full(len(data), np.nan)
+            high, low = (
+                data[col].to_numpy(dtype=np.float64, na_value=np.nan) if col in data.columns else missing
+                for col in ('high_price', 'low_price')
+            )
+            indicators = price_indicators(
+                data['close_price'].to_numpy(dtype=np.float64, na_value=np.nan), high, low,
+                np.array(windows, dtype=np.int64)
+            )
+            new_columns = {f'ma_{window}': indicators[:, i] for i, window in enumerate(windows)}
 
             if 'change_pct' not in data.columns:
-                data['change_pct'] = data['close_price'].pct_change() * 100
+                new_columns['change_pct'] = indicators[:, len(windows)]
 
             if 'amplitude' not in data.columns:
-                data['amplitude'] = ((data['high_price'] - data['low_price']) / data['close_price'].shift(1)) * 100
+                new_columns['amplitude'] = indicators[:, len(windows) + 1]
 
             if 'turnover_rate' not in data.columns:
-                data['turnover_rate'] = None
+                new_columns['turnover_rate'] = None
+
+            # 所有指标列一次拼接，避免逐列插入造成的多次块分配；已存在的均线列被新结果替换
+            data = pd.concat(
+                [data.drop(columns=list(new_columns), errors='ignore'),
+                 pd.DataFrame(new_columns, index=data.index)],
+                axis=1
+            )
 
             logger.info("计算基础技术指标成功")
             return data
@@ -448,6 +738,6 @@ try:
     timeout = config.get_data_fetch_timeout()
     max_retries = config.get_max_retries()
     basic_data = BasicData(timeout=timeout, max_retries=max_retries)
-except:
+except Exception:
     # 如果配置读取失败，使用默认值
     basic_data = BasicData(timeout=10, max_retries=3)
@@ -0,0 +1,84 @@
+"""
+基础数据获取缓存模块
+将数据源返回的标准化K线数据按 (股票, 周期, 复权方式) 保存为Parquet文件，
+时间轴上只追加，再次获取重叠区间时只需请求缓存未覆盖的部分
+"""
+
+import os
+import threading
+import pandas as pd
+from pathlib import Path
+from loguru import logger
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+    pq = None
+
+# 缓存覆盖的起始日期保存在Parquet文件的schema元数据中
+COVERED_START_KEY = b'covered_start'
+
+# 缓存格式版本，数据类型等变化时递增，旧版本的缓存文件视为不存在（版本2起价格列为float64）
+CACHE_VERSION_KEY = b'cache_version'
+CACHE_VERSION = b'2'
+
+
+class BasicDataCache:
+    """基础数据Parquet缓存"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.enabled = pyarrow is not None
+
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, stock_code, period, adjust):
+        """缓存文件路径"""
+        return self.cache_dir / f"{stock_code}_{period}_{adjust or 'none'}.parquet"
+
+    def load(self, stock_code, period, adjust):
+        """读取缓存，返回 (数据, 覆盖的起始日期)；无缓存时返回 (None, None)"""
+        path = self.path(stock_code, period, adjust)
+        if not self.enabled or not path.exists():
+            return None, None
+
+        try:
+            table = pq.read_table(path)
+            metadata = table.schema.metadata or {}
+            covered_start = metadata.get(COVERED_START_KEY)
+            data = table.to_pandas()
+
+            if data.empty or covered_start is None or metadata.get(CACHE_VERSION_KEY) != CACHE_VERSION:
+                return None, None
+
+            return data, pd.Timestamp(covered_start.decode())
+
+        except Exception as e:
+            logger.warning(f"读取股票 {stock_code} {period} 周期获取缓存失败: {e}")
+            return None, None
+
+    def save(self, data, stock_code, period, adjust, covered_start):
+        """写入缓存，covered_start为数据覆盖的起始日期（早于首条数据时表示该区间内无数据）"""
+        if not self.enabled or data.empty:
+            return
+
+        path = self.path(stock_code, period, adjust)
+        # 临时文件名区分线程，并发写同一只股票时互不覆盖写了一半的文件
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+
+        try:
+            table = pyarrow.Table.from_pandas(data, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[COVERED_START_KEY] = pd.Timestamp(covered_start).strftime('%Y-%m-%d').encode()
+            metadata[CACHE_VERSION_KEY] = CACHE_VERSION
+            pq.write_table(table.replace_schema_metadata(metadata), tmp_path, compression='zstd')
+            os.replace(tmp_path, path)
+
+        except Exception as e:
+            # 写入失败时删除缓存，下次重新获取完整数据
+            logger.warning(f"写入股票 {stock_code} {period} 周期获取缓存失败: {e}")
+            tmp_path.unlink(missing_ok=True)
+            path.unlink(missing_ok=True)
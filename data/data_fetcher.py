@@ -9,11 +9,10 @@ import numpy as np
 from datetime import datetime, timedelta
 import time
 import threading
-import queue
 from typing import Dict, List, Optional, Any, Callable
 from loguru import logger
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 import functools
+from data.http_session import install_shared_session, run_with_timeout, RETRY_ON, backoff_delay
 
 
 class DataFetcher:
@@ -22,12 +21,18 @@ class DataFetcher:
     def __init__(self, timeout=10, max_retries=3):
         self.timeout = timeout  # 超时时间（秒）
         self.max_retries = max_retries  # 最大重试次数
+
+        # akshare的HTTP请求复用长连接
+        install_shared_session()
         self.api_call_count = 0  # API调用计数器
         self.last_sleep_count = 0  # 上次休息时的调用次数
         self.api_call_count = 0  # API调用计数器
         self.last_sleep_count = 0  # 上次休息时的调用次数
         self.api_call_count = 0  # API调用计数器
         self.last_sleep_count = 0  # 上次休息时的调用次数
+        self._rate_limit_lock = threading.Lock()  # 保护调用计数器
+        self.stock_list_ttl = 300  # 股票列表缓存时间（秒）
+        self._stock_list_cache = None  # (获取时间, 股票列表)
 
         # 定义多个数据源的获取方法
         self.data_sources = {
@@ -40,44 +45,23 @@ class DataFetcher:
         self.source_priority = ['akshare_primary', 'akshare_backup', 'akshare_alternative']
 
     def _with_timeout(self, func: Callable, *args, **kwargs) -> Any:
-        """为函数添加超时机制"""
-        result_queue = queue.Queue()
-        exception_queue = queue.Queue()
-
-        def target():
-            try:
-                result = func(*args, **kwargs)
-                result_queue.put(result)
-            except Exception as e:
-                exception_queue.put(e)
-
-        thread = threading.Thread(target=target)
-        thread.daemon = True
-        thread.start()
-        thread.join(timeout=self.timeout)
-
-        if thread.is_alive():
-            logger.warning(f"函数 {func.__name__} 执行超时 ({self.timeout}秒)")
-            raise TimeoutError(f"函数执行超时: {self.timeout}秒")
-
-        if not exception_queue.empty():
-            raise exception_queue.get()
-
-        if not result_queue.empty():
-            return result_queue.get()
-
-        raise Exception("函数执行失败，无返回结果")
+        """为函数添加超时机制，在共享取数线程池中执行"""
+        return run_with_timeout(func, self.timeout, *args, **kwargs)
 
     def _rate_limit_check(self):
         """API调用频率控制 - 每调用10次后休息1秒"""
         import time
-        self.api_call_count += 1
+        # 多个线程并发调用时，计数器在锁内更新，休眠在锁外进行
+        with self._rate_limit_lock:
+            self.api_call_count += 1
+            calls = self.api_call_count - self.last_sleep_count
+            if calls >= 10:
+                self.last_sleep_count = self.api_call_count
 
         # 每调用10次API后休息1秒
-        if self.api_call_count - self.last_sleep_count >= 10:
-            logger.info(f"已连续调用API {self.api_call_count - self.last_sleep_count} 次，休息1秒...")
+        if calls >= 10:
+            logger.info(f"已连续调用API {calls} 次，休息1秒...")
             time.sleep(1)
-            self.last_sleep_count = self.api_call_count
         else:
             # 正常调用间隔0.1秒
             time.sleep(0.1)
@@ -86,13 +70,17 @@ class DataFetcher:
     def _rate_limit_check(self):
         """API调用频率控制 - 每调用10次后休息1秒"""
         import time
-        self.api_call_count += 1
+        # 多个线程并发调用时，计数器在锁内更新，休眠在锁外进行
+        with self._rate_limit_lock:
+            self.api_call_count += 1
+            calls = self.api_call_count - self.last_sleep_count
+            if calls >= 10:
+                self.last_sleep_count = self.api_call_count
 
         # 每调用10次API后休息1秒
-        if self.api_call_count - self.last_sleep_count >= 10:
-            logger.info(f"已连续调用API {self.api_call_count - self.last_sleep_count} 次，休息1秒...")
+        if calls >= 10:
+            logger.info(f"已连续调用API {calls} 次，休息1秒...")
             time.sleep(1)
-            self.last_sleep_count = self.api_call_count
         else:
             # 正常调用间隔0.1秒
             time.sleep(0.1)
@@ -101,13 +89,17 @@ class DataFetcher:
     def _rate_limit_check(self):
         """API调用频率控制 - 每调用10次后休息1秒"""
         import time
-        self.api_call_count += 1
+        # 多个线程并发调用时，计数器在锁内更新，休眠在锁外进行
+        with self._rate_limit_lock:
+            self.api_call_count += 1
+            calls = self.api_call_count - self.last_sleep_count
+            if calls >= 10:
+                self.last_sleep_count = self.api_call_count
 
         # 每调用10次API后休息1秒
-        if self.api_call_count - self.last_sleep_count >= 10:
-            logger.info(f"已连续调用API {self.api_call_count - self.last_sleep_count} 次，休息1秒...")
+        if calls >= 10:
+            logger.info(f"已连续调用API {calls} 次，休息1秒...")
             time.sleep(1)
-            self.last_sleep_count = self.api_call_count
         else:
             # 正常调用间隔0.1秒
             time.sleep(0.1)
@@ -120,7 +112,7 @@ class DataFetcher:
         for source_name in self.source_priority:
             for attempt in range(self.max_retries):
                 try:
-                    logger.info(f"尝试使用数据源 {source_name} 获取 {operation} (第{attempt + 1}次尝试)")
+                    logger.debug("尝试使用数据源 {} 获取 {} (第{}次尝试)", source_name, operation, attempt + 1)
 
                     source_func = self.data_sources[source_name]
                     result = self._with_timeout(source_func, operation, *args, **kwargs)
@@ -128,19 +120,22 @@ class DataFetcher:
                     if not result.empty:
                         logger.success(f"使用数据源 {source_name} 成功获取 {operation}")
                         return result
-                    else:
-                        logger.warning(f"数据源 {source_name} 返回空数据")
 
-                except TimeoutError as e:
-                    logger.warning(f"数据源 {source_name} 超时: {e}")
+                    # 空数据不是临时错误，不再重试同一数据源，直接切换下一个
+                    logger.warning(f"数据源 {source_name} 返回空数据")
+                    break
+
+                except RETRY_ON as e:
+                    logger.warning(f"数据源 {source_name} 请求失败: {e}")
                     last_error = e
-                    time.sleep(1)  # 短暂延迟后重试
+                    if attempt < self.max_retries - 1:
+                        time.sleep(backoff_delay(attempt))  # 指数退避后重试
 
                 except Exception as e:
+                    # 非网络错误（如接口返回格式变化）重试结果相同，直接切换下一个数据源
                     logger.error(f"数据源 {source_name} 错误: {e}")
                     last_error = e
-                    if attempt < self.max_retries - 1:
-                        time.sleep(2)  # 延迟后重试
+                    break
 
         logger.error(f"所有数据源均失败，最后错误: {last_error}")
         raise Exception(f"所有数据源均失败: {last_error}")
@@ -189,7 +184,7 @@ class DataFetcher:
                 sh_data = ak.stock_zh_index_spot_em(symbol="sh000001")
                 if not sh_data.empty:
                     indexes['sh000001'] = sh_data.iloc[0].to_dict()
-            except:
+            except Exception:
                 pass
 
             try:
@@ -197,7 +192,7 @@ class DataFetcher:
                 sz_data = ak.stock_zh_index_spot_em(symbol="sz399001")
                 if not sz_data.empty:
                     indexes['sz399001'] = sz_data.iloc[0].to_dict()
-            except:
+            except Exception:
                 pass
 
             return pd.DataFrame([indexes]) if indexes else pd.DataFrame()
@@ -247,7 +242,7 @@ class DataFetcher:
             # 使用新浪接口获取指数
             try:
                 return ak.stock_zh_index_spot()
-            except:
+            except Exception:
                 return pd.DataFrame()
 
         elif operation == 'sector_data':
@@ -319,8 +314,18 @@ class DataFetcher:
 
         return pd.DataFrame()
 
+    @property
+    def stock_list_fetched_at(self):
+        """缓存中股票列表的获取时间（time.monotonic()），没有缓存时为None；派生缓存据此判断是否需要重建"""
+        cached = self._stock_list_cache
+        return cached[0] if cached else None
+
     def get_stock_list(self) -> pd.DataFrame:
-        """获取股票列表"""
+        """获取股票列表，成功结果在stock_list_ttl秒内复用"""
+        now = time.monotonic()
+        if self._stock_list_cache and now - self._stock_list_cache[0] < self.stock_list_ttl:
+            return self._stock_list_cache[1].copy()
+
         try:
             self._rate_limit_check()  # API调用频率控制
             self._rate_limit_check()  # API调用频率控制
@@ -348,6 +353,7 @@ class DataFetcher:
                         result.columns = ['code', 'name'] + list(result.columns[2:])
 
                 logger.info(f"成功获取股票列表，共 {len(result)} 只股票")
+                self._stock_list_cache = (now, result.copy())
 
             return result
 
@@ -388,7 +394,7 @@ class DataFetcher:
                     if old_col in result.columns:
                         result = result.rename(columns={old_col: new_col})
 
-                logger.info(f"成功获取 {len(stock_codes)} 只股票的实时数据")
+                logger.debug("成功获取 {} 只股票的实时数据", len(stock_codes))
 
             return result
 
@@ -438,7 +444,7 @@ class DataFetcher:
                 # 添加股票代码
                 result['stock_code'] = stock_code
 
-                logger.info(f"成功获取股票 {stock_code} 历史数据，共 {len(result)} 条记录")
+                logger.debug("成功获取股票 {} 历史数据，共 {} 条记录", stock_code, len(result))
 
             return result
 
@@ -504,4 +510,4 @@ class DataFetcher:
 
 
 # 创建全局实例
-data_fetcher = DataFetcher(timeout=10, max_retries=3)
\ No newline at end of file
+data_fetcher = DataFetcher(timeout=10, max_retries=3)
@@ -5,13 +5,79 @@
 负责MySQL数据库连接和操作
 """
 
+from datetime import date
+from string import Template
 import pymysql
 import pandas as pd
 from sqlalchemy import create_engine, text
+from sqlalchemy.sql.elements import TextClause
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
 from loguru import logger
 from core.config import config
+from data.db_common import QUERY_CACHE_SIZE, basic_table_name, load_dataframe, upsert_dataframe
+
+
+def _as_statement(sql):
+    """SQL字符串包装为text语句；已构造好的text语句直接复用"""
+    return sql if isinstance(sql, TextClause) else text(sql)
+
+
+# 按日期分表的分笔数据表结构，表名来自get_tick_table_name（已校验）
+TICK_TABLE_DDL = Template("""
+CREATE TABLE IF NOT EXISTS $table_name (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    stock_code VARCHAR(20) NOT NULL,
+    trade_time DATETIME NOT NULL,
+    price DECIMAL(10,3) NOT NULL,
+    price_change DECIMAL(10,3),
+    volume INT NOT NULL,
+    amount DECIMAL(15,2) NOT NULL,
+    trade_type VARCHAR(10) NOT NULL,
+    trade_date DATE NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_stock_code (stock_code),
+    INDEX idx_trade_time (trade_time),
+    INDEX idx_stock_date (stock_code, trade_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+""")
+
+# 按周期分表的基础数据表结构，主键和分区定义随是否分区而不同
+BASIC_TABLE_DDL = Template("""
+CREATE TABLE IF NOT EXISTS $table_name (
+    id BIGINT AUTO_INCREMENT,
+    stock_code VARCHAR(20) NOT NULL,
+    trade_date DATE NOT NULL,
+    trade_time DATETIME,
+    open_price DECIMAL(10,3),
+    close_price DECIMAL(10,3),
+    high_price DECIMAL(10,3),
+    low_price DECIMAL(10,3),
+    volume BIGINT,
+    amount DECIMAL(15,2),
+    change_price DECIMAL(10,3),
+    change_pct DECIMAL(10,4),
+    turnover_rate DECIMAL(10,4),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    $primary_key,
+    UNIQUE KEY unique_data (stock_code, trade_date),
+    INDEX idx_date_code_amt (trade_date, stock_code, amount)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 $partition_clause
+""")
+
+# 基础数据表按年分区时单独分区的最近年数，更早的数据合并在一个分区中
+BASIC_PARTITION_YEARS = 10
+
+
+def _basic_partition_clause():
+    """基础数据表按trade_date年份的RANGE分区定义"""
+    current_year = date.today().year
+    first_year = current_year - BASIC_PARTITION_YEARS + 1
+    partitions = [f"PARTITION p_old VALUES LESS THAN ({first_year})"]
+    partitions += [f"PARTITION p{year} VALUES LESS THAN ({year + 1})" for year in range(first_year, current_year + 1)]
+    partitions.append("PARTITION p_max VALUES LESS THAN MAXVALUE")
+    return f"PARTITION BY RANGE (YEAR(trade_date)) ({', '.join(partitions)})"
 
 
 class DatabaseManager:
@@ -24,7 +90,21 @@ class DatabaseManager:
         self.password = config.get('database', 'password')
         self.database = config.get('database', 'database')
 
+        self.insert_chunksize = 10000  # 批量插入时每批的行数，避免单条语句超过max_allowed_packet
+        self.stream_chunksize = 50000  # 流式查询时每块的行数
+        # 新建的基础数据表按年份分区：按日期区间的查询可以裁剪分区，但不带日期条件的单股查询需要访问所有分区
+        self.partition_basic_tables = config.getboolean('database', 'partition_basic_tables', False)
+        # 追加写入动态表时使用LOAD DATA LOCAL INFILE，需服务端同时开启local_infile
+        self.local_infile = config.getboolean('database', 'local_infile', False)
+
+        # 每个进程（gunicorn每个worker一个进程）的连接预算，由写引擎和只读引擎分摊，
+        # 进程数乘以该预算需低于MySQL的max_connections（默认151）
+        self.pool_size = config.getint('database', 'pool_size', 5)
+        self.max_overflow = config.getint('database', 'max_overflow', 10)
+
         self.engine = None
+        self.read_engine = None  # 只读查询使用的自动提交引擎
+        self._existing_tables = set()  # 已确认存在的表，表在进程运行期间不会被本模块删除
         self.Session = None
         self._init_database()
 
@@ -33,7 +113,34 @@ class DatabaseManager:
         try:
             # 创建数据库引擎
             connection_string = f"mysql+pymysql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}?charset=utf8mb4"
-            self.engine = create_engine(connection_string, echo=False, pool_pre_ping=True)
+
+            # 连接预算在两个引擎间拆分，写引擎取较小的一半，只读查询更频繁取其余部分
+            write_pool_size = max(1, self.pool_size // 2)
+            write_max_overflow = self.max_overflow // 2
+
+            self.engine = create_engine(
+                connection_string,
+                echo=False,
+                pool_size=write_pool_size,
+                max_overflow=write_max_overflow,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+                query_cache_size=QUERY_CACHE_SIZE,
+                connect_args={'local_infile': True} if self.local_infile else {}
+            )
+
+            # 只读查询使用独立的自动提交连接池：不开启隐式事务，连接归还时也不需要发送ROLLBACK
+            self.read_engine = create_engine(
+                connection_string,
+                echo=False,
+                pool_size=max(1, self.pool_size - write_pool_size),
+                max_overflow=self.max_overflow - write_max_overflow,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+                query_cache_size=QUERY_CACHE_SIZE,
+                isolation_level='AUTOCOMMIT',
+                pool_reset_on_return=None
+            )
 
             # 创建会话
             self.Session = sessionmaker(bind=self.engine)
@@ -101,36 +208,15 @@ class DatabaseManager:
     def create_tick_data_table(self, trade_date):
         """创建按日期分表的分笔数据表"""
         try:
-            # 格式化日期为字符串，例如：tick_data_20251002
-            if isinstance(trade_date, str):
-                date_str = trade_date.replace('-', '')
-            else:
-                date_str = trade_date.strftime('%Y%m%d')
-
-            table_name = f"tick_data_{date_str}"
-
-            sql = f"""
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                id BIGINT AUTO_INCREMENT PRIMARY KEY,
-                stock_code VARCHAR(20) NOT NULL,
-                trade_time DATETIME NOT NULL,
-                price DECIMAL(10,3) NOT NULL,
-                price_change DECIMAL(10,3),
-                volume INT NOT NULL,
-                amount DECIMAL(15,2) NOT NULL,
-                trade_type VARCHAR(10) NOT NULL,
-                trade_date DATE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_stock_code (stock_code),
-                INDEX idx_trade_time (trade_time),
-                INDEX idx_stock_date (stock_code, trade_date)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-            """
+            table_name = self.get_tick_table_name(trade_date)
+            if table_name in self._existing_tables:
+                return table_name
 
             with self.engine.connect() as conn:
-                conn.execute(text(sql))
+                conn.execute(text(TICK_TABLE_DDL.substitute(table_name=table_name)))
                 conn.commit()
 
+            self._existing_tables.add(table_name)
             logger.info(f"分笔数据表 {table_name} 创建成功")
             return table_name
 
@@ -141,45 +227,26 @@ class DatabaseManager:
     def create_basic_data_table(self, period):
         """创建按周期分表的基础数据表"""
         try:
-            # 支持的周期：1min,5min,10min,15min,30min,1hour,daily,week,month,quarter,half-year,year
-            valid_periods = ['1min', '5min', '10min', '15min', '30min', '1hour',
-                           'daily', 'week', 'month', 'quarter', 'half-year', 'year']
-
-            if period not in valid_periods:
-                logger.error(f"不支持的周期: {period}")
-                return None
-
-            # 将period中的特殊字符替换为下划线
-            safe_period = period.replace('-', '_')
-            table_name = f"basic_data_{safe_period}"
-
-            sql = f"""
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                id BIGINT AUTO_INCREMENT PRIMARY KEY,
-                stock_code VARCHAR(20) NOT NULL,
-                trade_date DATE NOT NULL,
-                trade_time DATETIME,
-                open_price DECIMAL(10,3),
-                close_price DECIMAL(10,3),
-                high_price DECIMAL(10,3),
-                low_price DECIMAL(10,3),
-                volume BIGINT,
-                amount DECIMAL(15,2),
-                change_price DECIMAL(10,3),
-                change_pct DECIMAL(10,4),
-                turnover_rate DECIMAL(10,4),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                UNIQUE KEY unique_data (stock_code, trade_date),
-                INDEX idx_stock_code (stock_code),
-                INDEX idx_trade_date (trade_date)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-            """
+            table_name = self.get_basic_table_name(period)
+            if table_name in self._existing_tables:
+                return table_name
+
+            # 分区表的每个唯一键（包括主键）都必须包含分区列trade_date
+            if self.partition_basic_tables:
+                primary_key = "PRIMARY KEY (id, trade_date)"
+                partition_clause = _basic_partition_clause()
+            else:
+                primary_key = "PRIMARY KEY (id)"
+                partition_clause = ""
+
+            sql = BASIC_TABLE_DDL.substitute(table_name=table_name, primary_key=primary_key,
+                                             partition_clause=partition_clause)
 
             with self.engine.connect() as conn:
                 conn.execute(text(sql))
                 conn.commit()
 
+            self._existing_tables.add(table_name)
             logger.info(f"基础数据表 {table_name} 创建成功")
             return table_name
 
@@ -187,18 +254,39 @@ class DatabaseManager:
             logger.error(f"创建基础数据表失败: {e}")
             return None
 
+    def partition_basic_data_table(self, period):
+        """将已有的基础数据表改为按年份分区（迁移工具，会重建整张表，数据量大时耗时较长）"""
+        table_name = self.get_basic_table_name(period)
+
+        try:
+            with self.engine.connect() as conn:
+                # 先把主键扩展为包含分区列，再重建为分区表
+                conn.execute(text(f"ALTER TABLE {table_name} DROP PRIMARY KEY, ADD PRIMARY KEY (id, trade_date)"))
+                conn.execute(text(f"ALTER TABLE {table_name} {_basic_partition_clause()}"))
+                conn.commit()
+
+            logger.info(f"基础数据表 {table_name} 已改为按年份分区")
+            return True
+
+        except Exception as e:
+            logger.error(f"基础数据表 {table_name} 分区失败: {e}")
+            return False
+
     def get_tick_table_name(self, trade_date):
-        """获取分笔数据表名"""
+        """获取分笔数据表名，例如：tick_data_20251002；日期格式不合法时抛出ValueError"""
         if isinstance(trade_date, str):
             date_str = trade_date.replace('-', '')
         else:
             date_str = trade_date.strftime('%Y%m%d')
+
+        # 表名直接拼接进SQL，只允许8位数字日期
+        if not (len(date_str) == 8 and date_str.isdigit()):
+            raise ValueError(f"无效的交易日期: {trade_date}")
         return f"tick_data_{date_str}"
 
     def get_basic_table_name(self, period):
-        """获取基础数据表名"""
-        safe_period = period.replace('-', '_')
-        return f"basic_data_{safe_period}"
+        """获取基础数据表名；不支持的周期抛出ValueError"""
+        return basic_table_name(period)
 
     def insert_dataframe_to_dynamic_table(self, df, table_type, date_or_period, if_exists='append'):
         """将DataFrame插入到动态表中"""
@@ -211,7 +299,12 @@ class DatabaseManager:
                 raise ValueError(f"不支持的表类型: {table_type}")
 
             if table_name:
-                df.to_sql(table_name, self.engine, if_exists=if_exists, index=False)
+                if table_type == 'basic' and if_exists == 'append':
+                    # 基础数据表有 (stock_code, trade_date) 唯一键，按唯一键写入，重复写入同一段数据不会失败
+                    return self.upsert_dataframe(df, table_name, ['stock_code', 'trade_date'])
+
+                if not (self.local_infile and if_exists == 'append' and load_dataframe(self.engine, df, table_name)):
+                    df.to_sql(table_name, self.engine, if_exists=if_exists, index=False, chunksize=self.insert_chunksize)
                 logger.info(f"成功插入 {len(df)} 条数据到表 {table_name}")
                 return True
             return False
@@ -237,25 +330,96 @@ class DatabaseManager:
         """执行SQL语句"""
         try:
             with self.engine.connect() as conn:
-                result = conn.execute(text(sql), params or {})
+                result = conn.execute(_as_statement(sql), params or {})
                 conn.commit()
                 return result
         except Exception as e:
             logger.error(f"SQL执行失败: {sql}, 错误: {e}")
             raise
 
-    def query_to_dataframe(self, sql, params=None):
-        """执行查询并返回DataFrame"""
+    def query_scalar(self, sql, params=None):
+        """执行查询并返回第一行第一列的值，无结果时返回None，不构造DataFrame"""
+        try:
+            with self.read_engine.connect() as conn:
+                return conn.execute(_as_statement(sql), params or {}).scalar()
+        except Exception as e:
+            logger.error(f"查询失败: {sql}, 错误: {e}")
+            return None
+
+    def query_one(self, sql, params=None):
+        """执行查询并以dict返回第一行，无结果时返回None，不构造DataFrame"""
         try:
-            return pd.read_sql(sql, self.engine, params=params)
+            with self.read_engine.connect() as conn:
+                row = conn.execute(_as_statement(sql), params or {}).mappings().first()
+                return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"查询失败: {sql}, 错误: {e}")
+            return None
+
+    def table_exists(self, table_name):
+        """检查当前数据库中是否存在指定表，已确认存在的表不再查询information_schema"""
+        return table_name in self.filter_existing_tables([table_name])
+
+    def filter_existing_tables(self, table_names):
+        """返回table_names中已存在的表名集合，只对未确认过的表名发起一次查询"""
+        unknown = [name for name in table_names if name not in self._existing_tables]
+
+        if unknown:
+            placeholders = ','.join(f':table_name_{i}' for i in range(len(unknown)))
+            existing = self.query_to_dataframe(
+                "SELECT table_name FROM information_schema.tables "
+                f"WHERE table_schema = DATABASE() AND table_name IN ({placeholders})",
+                {f'table_name_{i}': name for i, name in enumerate(unknown)}
+            )
+            # 不存在的表不缓存，之后仍可能被创建
+            if not existing.empty:
+                self._existing_tables.update(existing.iloc[:, 0])
+
+        return {name for name in table_names if name in self._existing_tables}
+
+    def query_to_dataframe(self, sql, params=None, chunksize=None, stream=False):
+        """执行查询并返回DataFrame；指定chunksize时使用服务端游标，返回按块产出DataFrame的迭代器，
+        迭代过程中的数据库错误直接抛出，调用方据此得知结果不完整
+
+        stream为True时同样经服务端游标分块读取后拼接为一个DataFrame：驱动不必先把全部结果缓存为Python元组，
+        适合大结果集
+        """
+        if chunksize:
+            return self._read_query_chunks(sql, params, chunksize)
+
+        try:
+            if stream:
+                chunks = list(self._read_query_chunks(sql, params, self.stream_chunksize))
+                return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+            return pd.read_sql(_as_statement(sql), self.read_engine, params=params)
         except Exception as e:
             logger.error(f"查询失败: {sql}, 错误: {e}")
             return pd.DataFrame()
 
+    def _read_query_chunks(self, sql, params, chunksize):
+        """通过服务端游标按块产出DataFrame，出错时直接抛出"""
+        with self.read_engine.connect().execution_options(stream_results=True) as conn:
+            yield from pd.read_sql(_as_statement(sql), conn, params=params, chunksize=chunksize)
+
+    def upsert_dataframe(self, df, table_name, unique_columns):
+        """按唯一键批量写入DataFrame，已存在的行更新其余列（INSERT ... ON DUPLICATE KEY UPDATE），可重复执行"""
+        if df.empty:
+            return True
+
+        try:
+            upsert_dataframe(self.engine, df, table_name, unique_columns, self.insert_chunksize)
+            logger.info(f"成功写入 {len(df)} 条数据到表 {table_name}")
+            return True
+
+        except Exception as e:
+            logger.error(f"写入数据到表 {table_name} 失败: {e}")
+            return False
+
     def insert_dataframe(self, df, table_name, if_exists='append'):
         """将DataFrame插入数据库"""
         try:
-            df.to_sql(table_name, self.engine, if_exists=if_exists, index=False)
+            df.to_sql(table_name, self.engine, if_exists=if_exists, index=False, chunksize=self.insert_chunksize)
             logger.info(f"成功插入 {len(df)} 条数据到表 {table_name}")
         except Exception as e:
             logger.error(f"插入数据失败: {e}")
@@ -265,7 +429,9 @@ class DatabaseManager:
         """关闭数据库连接"""
         if self.engine:
             self.engine.dispose()
-            logger.info("数据库连接已关闭")
+        if self.read_engine:
+            self.read_engine.dispose()
+        logger.info("数据库连接已关闭")
 
 
 # 全局数据库实例
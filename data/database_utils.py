@@ -5,8 +5,62 @@
 用于检查和创建必要的数据库表
 """
 
+import time
 from loguru import logger
+from sqlalchemy import text
 from core.config import config
+from data.db_common import BASIC_PERIODS, basic_table_name
+
+# 各统计查询的SQL模板，表名之外的变化部分均为绑定参数
+STATEMENT_TEMPLATES = {
+    'latest_date': "SELECT MAX(trade_date) as latest_date FROM {table_name}",
+    'statistics': """
+        SELECT 
+            COUNT(*) as total_records,
+            COUNT(DISTINCT stock_code) as stock_count,
+            MAX(trade_date) as latest_date,
+            MIN(trade_date) as earliest_date
+        FROM {table_name}
+        """,
+    'top_amount': """
+        SELECT 
+            stock_code, 
+            AVG(amount) as avg_amount,
+            COUNT(*) as trade_days
+        FROM {table_name}
+        WHERE trade_date >= :start_date AND trade_date <= :end_date
+        GROUP BY stock_code
+        HAVING trade_days >= 5  -- 至少有5个交易日的数据
+        ORDER BY avg_amount DESC
+        LIMIT :limit
+        """,
+}
+
+_stmt_cache = {}  # {(查询类型, 表名): text语句}
+
+# 周期统计信息的缓存时间（秒）
+SUMMARY_TTL = 60
+
+_summary_cache = {}  # {表名: (查询时间, 统计信息)}
+
+# 热门股票查询返回行数超过该值时经服务端游标分块读取
+STREAM_ROW_THRESHOLD = 10000
+
+
+def _cached_summary(table_name):
+    """SUMMARY_TTL秒内查询过的统计信息，没有时返回None"""
+    cached = _summary_cache.get(table_name)
+    if cached and time.monotonic() - cached[0] < SUMMARY_TTL:
+        return cached[1]
+    return None
+
+
+def _statement(kind, table_name):
+    """获取缓存的查询语句，同一查询和表只构造一次"""
+    stmt = _stmt_cache.get((kind, table_name))
+    if stmt is None:
+        stmt = _stmt_cache[(kind, table_name)] = text(STATEMENT_TEMPLATES[kind].format(table_name=table_name))
+    return stmt
 
 
 def ensure_basic_data_tables():
@@ -14,25 +68,23 @@ def ensure_basic_data_tables():
     try:
         from data.enhanced_database import enhanced_db_manager
 
-        # 支持的时间周期
-        periods = ['1min', '5min', '10min', '15min', '30min', '1hour', 'daily', 'week', 'month', 'quarter', 'half_year',
-                   'year']
-
         created_tables = []
-        existing_tables = []
 
-        for period in periods:
-            table_name = f"basic_data_{period}"
+        # 一次查询检查全部周期的表，结果同时写入表存在检查缓存
+        table_names = {period: basic_table_name(period) for period in BASIC_PERIODS}
+        present_tables = enhanced_db_manager.filter_existing_tables(list(table_names.values()))
+
+        existing_tables = [name for name in table_names.values() if name in present_tables]
 
-            if enhanced_db_manager.table_exists(table_name):
-                existing_tables.append(table_name)
-            else:
-                try:
-                    enhanced_db_manager.create_basic_data_table(period)
-                    created_tables.append(table_name)
-                    logger.info(f"创建数据表: {table_name}")
-                except Exception as e:
-                    logger.error(f"创建数据表 {table_name} 失败: {e}")
+        # 早于覆盖索引加入建表语句的已有表补建索引
+        enhanced_db_manager.ensure_basic_data_indexes(existing_tables)
+
+        # 缺失的表在同一连接中一并创建
+        missing_periods = [period for period, name in table_names.items() if name not in present_tables]
+        if missing_periods:
+            created_tables = enhanced_db_manager.create_basic_data_tables(missing_periods)
+            for table_name in created_tables:
+                logger.info(f"创建数据表: {table_name}")
 
         print(f"✅ 数据表检查完成:")
         print(f"   已存在表: {len(existing_tables)} 个")
@@ -54,14 +106,14 @@ def get_latest_data_date(period: str = 'daily'):
     try:
         from data.enhanced_database import enhanced_db_manager
 
-        table_name = f"basic_data_{period}"
+        table_name = basic_table_name(period)
 
+        # 不使用统计信息缓存：数据写入后需要立即反映最新日期；MAX(trade_date)走idx_date_code_amt索引的最左列，查询代价很低
         if not enhanced_db_manager.table_exists(table_name):
             return None
 
-        sql = f"SELECT MAX(trade_date) as latest_date FROM {table_name}"
         result = enhanced_db_manager.safe_query_to_dataframe(
-            sql,
+            _statement('latest_date', table_name),
             required_tables=[table_name]
         )
 
@@ -75,12 +127,16 @@ def get_latest_data_date(period: str = 'daily'):
         return None
 
 
-def get_data_statistics(period: str = 'daily'):
-    """获取指定周期的数据统计信息"""
+def get_period_summary(period: str = 'daily'):
+    """一次查询获取指定周期的记录数、股票数、最早和最新日期，SUMMARY_TTL秒内复用查询结果"""
     try:
         from data.enhanced_database import enhanced_db_manager
 
-        table_name = f"basic_data_{period}"
+        table_name = basic_table_name(period)
+
+        summary = _cached_summary(table_name)
+        if summary is not None:
+            return dict(summary)
 
         if not enhanced_db_manager.table_exists(table_name):
             return {
@@ -92,17 +148,8 @@ def get_data_statistics(period: str = 'daily'):
             }
 
         # 获取基本统计信息
-        sql = f"""
-        SELECT 
-            COUNT(*) as total_records,
-            COUNT(DISTINCT stock_code) as stock_count,
-            MAX(trade_date) as latest_date,
-            MIN(trade_date) as earliest_date
-        FROM {table_name}
-        """
-
         result = enhanced_db_manager.safe_query_to_dataframe(
-            sql,
+            _statement('statistics', table_name),
             required_tables=[table_name]
         )
 
@@ -118,6 +165,7 @@ def get_data_statistics(period: str = 'daily'):
         stats = result.iloc[0].to_dict()
         stats['table_exists'] = True
 
+        _summary_cache[table_name] = (time.monotonic(), dict(stats))
         return stats
 
     except Exception as e:
@@ -132,13 +180,18 @@ def get_data_statistics(period: str = 'daily'):
         }
 
 
+def get_data_statistics(period: str = 'daily'):
+    """获取指定周期的数据统计信息"""
+    return get_period_summary(period)
+
+
 def get_top_stocks_by_amount(period: str = 'daily', limit: int = 50, days: int = 30):
     """获取按成交额排序的热门股票"""
     try:
         from data.enhanced_database import enhanced_db_manager
         from datetime import datetime, timedelta
 
-        table_name = f"basic_data_{period}"
+        table_name = basic_table_name(period)
 
         if not enhanced_db_manager.table_exists(table_name):
             return []
@@ -147,22 +200,11 @@ def get_top_stocks_by_amount(period: str = 'daily', limit: int = 50, days: int =
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
 
-        sql = f"""
-        SELECT 
-            stock_code, 
-            AVG(amount) as avg_amount,
-            COUNT(*) as trade_days
-        FROM {table_name}
-        WHERE trade_date >= '{start_date}' AND trade_date <= '{end_date}'
-        GROUP BY stock_code
-        HAVING trade_days >= 5  -- 至少有5个交易日的数据
-        ORDER BY avg_amount DESC
-        LIMIT {limit}
-        """
-
         result = enhanced_db_manager.safe_query_to_dataframe(
-            sql,
-            required_tables=[table_name]
+            _statement('top_amount', table_name),
+            {'start_date': start_date, 'end_date': end_date, 'limit': int(limit)},
+            required_tables=[table_name],
+            stream=limit > STREAM_ROW_THRESHOLD
         )
 
         return result.to_dict('records') if not result.empty else []
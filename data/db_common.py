@@ -0,0 +1,100 @@
+"""
+数据库公共模块
+DatabaseManager与EnhancedDatabaseManager共用的引擎配置和批量写入实现，不创建连接，导入时没有副作用
+"""
+
+import os
+import tempfile
+from loguru import logger
+
+# SQLAlchemy编译语句缓存的容量（默认500）：表按周期和日期拆分，同一查询会对应许多表名
+QUERY_CACHE_SIZE = 1200
+
+# 基础数据支持的周期（与core.config默认值一致，使用half-year写法）
+BASIC_PERIODS = ('1min', '5min', '10min', '15min', '30min', '1hour',
+                 'daily', 'week', 'month', 'quarter', 'half-year', 'year')
+
+
+def normalize_period(period):
+    """返回周期的标准写法（half_year等同half-year）；不支持的周期抛出ValueError"""
+    normalized = period.replace('_', '-')
+    if normalized not in BASIC_PERIODS:
+        raise ValueError(f"不支持的周期: {period}")
+    return normalized
+
+
+def basic_table_name(period):
+    """获取基础数据表名，例如：basic_data_half_year；表名直接拼接进SQL，不支持的周期抛出ValueError"""
+    return f"basic_data_{normalize_period(period).replace('-', '_')}"
+
+
+def load_dataframe(engine, df, table_name):
+    """通过LOAD DATA LOCAL INFILE将DataFrame整体导入已存在的表，一条语句完成；失败时返回False
+
+    连接需开启local_infile。pymysql的LOCAL INFILE按文件名读取，不支持内存流，经临时文件中转
+    """
+    if df.empty:
+        return True
+
+    fd, tsv_path = tempfile.mkstemp(suffix='.tsv')
+    try:
+        # \N 为MySQL导入文件中的NULL
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            df.to_csv(f, index=False, header=False, sep='\t', na_rep='\\N', lineterminator='\n',
+                      date_format='%Y-%m-%d %H:%M:%S')
+
+        sql = f"""
+        LOAD DATA LOCAL INFILE '{tsv_path.replace(os.sep, '/')}'
+        INTO TABLE {table_name}
+        CHARACTER SET utf8mb4
+        FIELDS TERMINATED BY '\\t' OPTIONALLY ENCLOSED BY '"'
+        LINES TERMINATED BY '\\n'
+        ({', '.join(df.columns)})
+        """
+        with engine.begin() as conn:
+            conn.exec_driver_sql(sql)
+        return True
+
+    except Exception as e:
+        logger.warning(f"LOAD DATA导入表 {table_name} 失败，改用INSERT写入: {e}")
+        return False
+
+    finally:
+        os.unlink(tsv_path)
+
+
+def upsert_dataframe(engine, df, table_name, unique_columns, batch_size):
+    """按唯一键批量写入DataFrame（INSERT ... ON DUPLICATE KEY UPDATE），已存在的行更新唯一键、id、created_at以外的列
+
+    每批一条多行INSERT，一次往返、一次解析，不经SQLAlchemy逐行绑定参数；全部批次在同一事务中，出错时抛出。
+    返回写入的行数
+    """
+    if df.empty:
+        return 0
+
+    columns = list(df.columns)
+    row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+    update_clause = ', '.join(
+        f'{col} = VALUES({col})' for col in columns
+        if col not in unique_columns and col not in ('id', 'created_at')
+    )
+    if not update_clause:
+        # 没有可更新的列时已存在的行保持不变；不用INSERT IGNORE，以免掩盖其他写入错误
+        update_clause = f'{unique_columns[0]} = {unique_columns[0]}'
+
+    # NaN转为None写入NULL；转为object后为Python原生值，按行展开为一维参数列表
+    values = df.astype(object).where(df.notna(), None).to_numpy()
+    total_rows = len(values)
+
+    with engine.begin() as conn:
+        for i in range(0, total_rows, batch_size):
+            batch = values[i:i + batch_size]
+            sql = (f"INSERT INTO {table_name} ({', '.join(columns)}) "
+                   f"VALUES {', '.join([row_placeholder] * len(batch))} "
+                   f"ON DUPLICATE KEY UPDATE {update_clause}")
+            conn.exec_driver_sql(sql, tuple(batch.ravel().tolist()))
+
+            if total_rows > batch_size:
+                logger.info(f"已处理 {i + len(batch)}/{total_rows} 行 (UPSERT)")
+
+    return total_rows
@@ -3,18 +3,59 @@
 优化批量插入和查询性能，支持事务管理和连接池
 """
 
+import time
 import pandas as pd
 import numpy as np
 from sqlalchemy import create_engine, text, MetaData, Table, Column, Integer, String, Float, Date, DateTime, Text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.engine import Engine
+from sqlalchemy.sql.elements import TextClause
 from sqlalchemy.pool import QueuePool
 import pymysql
 from typing import Dict, List, Optional, Union, Any
 from datetime import datetime, date
 import json
+from string import Template
 from loguru import logger
 from core.config import config
+from data.db_common import QUERY_CACHE_SIZE, basic_table_name, load_dataframe, upsert_dataframe
+
+# 按日期/周期分表的动态表前缀，追加写入时可走LOAD DATA
+DYNAMIC_TABLE_PREFIXES = ('tick_data_', 'basic_data_')
+
+# 按周期分表的基础数据表结构
+BASIC_DATA_DDL = Template("""
+CREATE TABLE IF NOT EXISTS $table_name (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    stock_code VARCHAR(10) NOT NULL,
+    trade_date DATE NOT NULL,
+    trade_time DATETIME,
+    open_price DECIMAL(10,3),
+    high_price DECIMAL(10,3),
+    low_price DECIMAL(10,3),
+    close_price DECIMAL(10,3),
+    volume BIGINT,
+    amount DECIMAL(20,2),
+    turnover_rate DECIMAL(8,4),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uk_stock_date (stock_code, trade_date),
+    INDEX idx_date_code_amt (trade_date, stock_code, amount)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+""")
+
+# 按日期区间汇总各股票成交额的覆盖索引，早于该索引创建的表由ensure_basic_data_indexes补建；
+# 按日期的查询也使用它的最左前缀，不再需要单独的idx_trade_date
+BASIC_COVERING_INDEX = ('idx_date_code_amt', '(trade_date, stock_code, amount)')
+
+# 旧表上的冗余索引：idx_trade_date是覆盖索引的最左前缀，idx_stock_code是唯一键(stock_code, trade_date)的前缀
+BASIC_REDUNDANT_INDEXES = ('idx_trade_date', 'idx_stock_code')
+
+# 入库为DECIMAL的数值列：上游以Python Decimal对象（object列）给出时先转为float64，
+# 序列化时不再逐个调用Python；已是数值类型的列保持原样
+DECIMAL_COLUMNS = ('open_price', 'high_price', 'low_price', 'close_price', 'amount', 'turnover_rate')
+
+# 表是否存在的检查结果缓存时间（秒）
+TABLE_EXISTS_TTL = 60
 
 Base = declarative_base()
 
@@ -27,6 +68,10 @@ class EnhancedDatabaseManager:
         self.Session = None
         self.metadata = MetaData()
         self._connection_pool = None
+        self._table_exists_cache = {}  # {表名: (检查时间, 是否存在)}
+        self._reflected_tables = {}  # {表名: 反射得到的Table}，追加写入时复用
+        # 追加写入动态表时使用LOAD DATA LOCAL INFILE，需服务端同时开启local_infile
+        self.local_infile = config.getboolean('database', 'local_infile', False)
         self.init_database()
 
     def init_database(self):
@@ -56,7 +101,10 @@ class EnhancedDatabaseManager:
                 max_overflow=30,
                 pool_pre_ping=True,
                 pool_recycle=3600,
-                echo=False
+                echo=False,
+                insertmanyvalues_page_size=1000,
+                query_cache_size=QUERY_CACHE_SIZE,
+                connect_args={'local_infile': True} if self.local_infile else {}
             )
 
             # 创建会话工厂
@@ -268,6 +316,7 @@ class EnhancedDatabaseManager:
                 with conn.begin():
                     conn.execute(text(tick_data_ddl))
 
+            self._table_exists_cache[table_name] = (time.monotonic(), True)
             logger.info(f"分笔数据表 {table_name} 创建成功")
             return table_name
 
@@ -277,49 +326,75 @@ class EnhancedDatabaseManager:
 
     def create_basic_data_table(self, period):
         """创建按周期分表的基础数据表"""
-        try:
-            # 支持的周期：1min,5min,10min,15min,30min,1hour,daily,week,month,quarter,half-year,year
-            valid_periods = ['1min', '5min', '10min', '15min', '30min', '1hour',
-                           'daily', 'week', 'month', 'quarter', 'half-year', 'year']
-
-            if period not in valid_periods:
-                logger.error(f"不支持的周期: {period}")
-                return None
+        tables = self.create_basic_data_tables([period])
+        return tables[0] if tables else None
 
-            # 将period中的特殊字符替换为下划线
-            safe_period = period.replace('-', '_')
-            table_name = f"basic_data_{safe_period}"
+    def create_basic_data_tables(self, periods: List[str]) -> List[str]:
+        """在同一连接中创建多个周期的基础数据表，返回创建成功的表名列表"""
+        table_names = []
+        for period in periods:
+            try:
+                table_names.append(basic_table_name(period))
+            except ValueError as e:
+                logger.error(str(e))
 
-            basic_data_ddl = f"""
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                id BIGINT AUTO_INCREMENT PRIMARY KEY,
-                stock_code VARCHAR(10) NOT NULL,
-                trade_date DATE NOT NULL,
-                trade_time DATETIME,
-                open_price DECIMAL(10,3),
-                high_price DECIMAL(10,3),
-                low_price DECIMAL(10,3),
-                close_price DECIMAL(10,3),
-                volume BIGINT,
-                amount DECIMAL(20,2),
-                turnover_rate DECIMAL(8,4),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE KEY uk_stock_date (stock_code, trade_date),
-                INDEX idx_stock_code (stock_code),
-                INDEX idx_trade_date (trade_date)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """
+        if not table_names:
+            return []
 
+        try:
             with self.engine.connect() as conn:
                 with conn.begin():
-                    conn.execute(text(basic_data_ddl))
+                    for table_name in table_names:
+                        conn.execute(text(BASIC_DATA_DDL.substitute(table_name=table_name)))
 
-            logger.info(f"基础数据表 {table_name} 创建成功")
-            return table_name
+            now = time.monotonic()
+            for table_name in table_names:
+                self._table_exists_cache[table_name] = (now, True)
+                logger.info(f"基础数据表 {table_name} 创建成功")
+            return table_names
 
         except Exception as e:
             logger.error(f"创建基础数据表失败: {e}")
-            return None
+            return []
+
+    def ensure_basic_data_indexes(self, table_names: List[str]) -> List[str]:
+        """为缺少覆盖索引BASIC_COVERING_INDEX的已有基础数据表补建索引，同时删除冗余索引，返回补建的表名列表"""
+        if not table_names:
+            return []
+
+        index_name, index_columns = BASIC_COVERING_INDEX
+        index_names = (index_name,) + BASIC_REDUNDANT_INDEXES
+        placeholders = ', '.join(f':table_name_{i}' for i in range(len(table_names)))
+        index_placeholders = ', '.join(f':index_name_{i}' for i in range(len(index_names)))
+        # MySQL不支持ADD/DROP INDEX IF [NOT] EXISTS，先一次查出各表已有的相关索引
+        indexes = self.query_to_dataframe(
+            "SELECT DISTINCT table_name, index_name FROM information_schema.statistics "
+            f"WHERE table_schema = DATABASE() AND index_name IN ({index_placeholders}) "
+            f"AND table_name IN ({placeholders})",
+            {**{f'index_name_{i}': name for i, name in enumerate(index_names)},
+             **{f'table_name_{i}': name for i, name in enumerate(table_names)}}
+        )
+        existing = set(zip(indexes.iloc[:, 0], indexes.iloc[:, 1])) if not indexes.empty else set()
+
+        added_tables = []
+        for table_name in table_names:
+            if (table_name, index_name) in existing:
+                continue
+
+            # 添加覆盖索引和删除冗余索引在同一条ALTER TABLE中完成，只重建一次表
+            alter_clauses = [f"ADD INDEX {index_name} {index_columns}"]
+            alter_clauses += [f"DROP INDEX {name}" for name in BASIC_REDUNDANT_INDEXES
+                              if (table_name, name) in existing]
+            try:
+                with self.engine.connect() as conn:
+                    with conn.begin():
+                        conn.execute(text(f"ALTER TABLE {table_name} {', '.join(alter_clauses)}"))
+                added_tables.append(table_name)
+                logger.info(f"已为表 {table_name} 添加索引 {index_name}")
+            except Exception as e:
+                logger.error(f"为表 {table_name} 添加索引 {index_name} 失败: {e}")
+
+        return added_tables
 
     def get_tick_table_name(self, trade_date):
         """获取分笔数据表名"""
@@ -330,16 +405,15 @@ class EnhancedDatabaseManager:
         return f"tick_data_{date_str}"
 
     def get_basic_table_name(self, period):
-        """获取基础数据表名"""
-        safe_period = period.replace('-', '_')
-        return f"basic_data_{safe_period}"
+        """获取基础数据表名；不支持的周期抛出ValueError"""
+        return basic_table_name(period)
 
     def batch_insert_dataframe(self,
                                df: pd.DataFrame,
                                table_name: str,
                                if_exists: str = 'append',
                                batch_size: int = 1000,
-                               method: str = 'multi') -> bool:
+                               method: Optional[str] = None) -> bool:
         """
         批量插入DataFrame数据，优化性能
 
@@ -348,7 +422,8 @@ class EnhancedDatabaseManager:
             table_name: 目标表名
             if_exists: 如果表存在时的操作 ('fail', 'replace', 'append')
             batch_size: 批次大小
-            method: 插入方法 ('multi' 或 None)
+            method: 插入方法 (None 或 'multi')；默认None走executemany，由驱动合并为多行INSERT，
+                    'multi'需为每批编译带大量绑定参数的单条语句，更慢
         """
         try:
             if df.empty:
@@ -358,23 +433,38 @@ class EnhancedDatabaseManager:
             # 数据预处理
             df_clean = self._preprocess_dataframe(df)
 
+            # 分笔/基础数据动态表追加时整体LOAD DATA导入，失败时回退到分批INSERT
+            if (self.local_infile and if_exists == 'append' and table_name.startswith(DYNAMIC_TABLE_PREFIXES)
+                    and load_dataframe(self.engine, df_clean, table_name)):
+                logger.info(f"批量导入完成: {len(df_clean)} 行到表 {table_name}")
+                return True
+
             # 分批插入
             total_rows = len(df_clean)
             inserted_rows = 0
 
             for i in range(0, total_rows, batch_size):
-                batch_df = df_clean.iloc[i:i + batch_size].copy()
+                # to_sql不修改传入的数据，直接使用切片
+                batch_df = df_clean.iloc[i:i + batch_size]
 
                 try:
-                    # 使用to_sql进行批量插入
-                    batch_df.to_sql(
-                        name=table_name,
-                        con=self.engine,
-                        if_exists=if_exists if i == 0 else 'append',
-                        index=False,
-                        method=method,
-                        chunksize=min(batch_size, 500)
-                    )
+                    batch_if_exists = if_exists if i == 0 else 'append'
+                    if batch_if_exists == 'append' and method is None and self.table_exists(table_name):
+                        # 追加到已有表时直接执行反射得到的INSERT，不再每批经to_sql检查表
+                        self._insert_records(table_name, batch_df)
+                    else:
+                        # 使用to_sql进行批量插入
+                        batch_df.to_sql(
+                            name=table_name,
+                            con=self.engine,
+                            if_exists=batch_if_exists,
+                            index=False,
+                            method=method,
+                            chunksize=batch_size if method is None else min(batch_size, 500)
+                        )
+                        # 表可能被新建或重建，之后重新反射
+                        self._reflected_tables.pop(table_name, None)
+                        self._table_exists_cache[table_name] = (time.monotonic(), True)
 
                     inserted_rows += len(batch_df)
 
@@ -393,30 +483,56 @@ class EnhancedDatabaseManager:
             logger.error(f"批量插入DataFrame失败: {e}")
             return False
 
-    def _preprocess_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
-        """预处理DataFrame数据"""
+    def _reflected_table(self, table_name: str) -> Table:
+        """获取表结构，每个表只反射一次"""
+        table = self._reflected_tables.get(table_name)
+        if table is None:
+            table = Table(table_name, MetaData(), autoload_with=self.engine)
+            self._reflected_tables[table_name] = table
+        return table
+
+    def _insert_records(self, table_name: str, df: pd.DataFrame):
+        """以executemany方式将DataFrame写入已存在的表，NaN写为NULL"""
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        with self.engine.begin() as conn:
+            conn.execute(self._reflected_table(table_name).insert(), records)
+
+    @staticmethod
+    def _insert_dtypes(df: pd.DataFrame) -> Dict[str, str]:
+        """DECIMAL_COLUMNS中仍为object（如Decimal对象）的列，需转换为float64"""
+        return {col: 'float64' for col in DECIMAL_COLUMNS if col in df.columns and df[col].dtype == object}
+
+    def _preprocess_dataframe(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+        """预处理DataFrame数据；无需处理时原样返回，需要修改时copy为False则直接修改传入的DataFrame"""
         try:
-            df_clean = df.copy()
-
-            # 处理无穷大和NaN值
-            df_clean = df_clean.replace([np.inf, -np.inf], np.nan)
+            # 类型转换生成新的DataFrame，之后的修改无需再复制
+            owned = not copy
+            dtypes = self._insert_dtypes(df)
+            if dtypes:
+                df = df.astype(dtypes)
+                owned = True
+
+            # 数值列的无穷大按NaN处理，NaN由to_sql/LOAD DATA写为NULL
+            numeric_columns = df.select_dtypes(include=[np.number]).columns
+            has_inf = len(numeric_columns) > 0 and np.isinf(
+                df[numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            ).any()
+
+            # 尚未转换为日期时间类型的日期列和时间列
+            time_columns = [col for col in ('trade_date', 'list_date', 'trade_time', 'created_at', 'updated_at')
+                            if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col])]
+
+            # 只在确实需要修改时才复制
+            if not has_inf and not time_columns:
+                return df
 
-            # 对于数值列，填充NaN为None
-            numeric_columns = df_clean.select_dtypes(include=[np.number]).columns
-            for col in numeric_columns:
-                df_clean[col] = df_clean[col].where(pd.notnull(df_clean[col]), None)
+            df_clean = df if owned else df.copy()
 
-            # 处理日期列
-            date_columns = ['trade_date', 'list_date']
-            for col in date_columns:
-                if col in df_clean.columns:
-                    df_clean[col] = pd.to_datetime(df_clean[col], errors='coerce')
+            if has_inf:
+                df_clean[numeric_columns] = df_clean[numeric_columns].replace([np.inf, -np.inf], np.nan)
 
-            # 处理时间列
-            datetime_columns = ['trade_time', 'created_at', 'updated_at']
-            for col in datetime_columns:
-                if col in df_clean.columns:
-                    df_clean[col] = pd.to_datetime(df_clean[col], errors='coerce')
+            if time_columns:
+                df_clean[time_columns] = df_clean[time_columns].apply(pd.to_datetime, errors='coerce')
 
             return df_clean
 
@@ -452,22 +568,49 @@ class EnhancedDatabaseManager:
             return False
 
     def table_exists(self, table_name: str) -> bool:
-        """检查表是否存在"""
+        """检查表是否存在，TABLE_EXISTS_TTL秒内复用上次的检查结果"""
+        cached = self._table_exists_cache.get(table_name)
+        if cached and time.monotonic() - cached[0] < TABLE_EXISTS_TTL:
+            return cached[1]
+
         try:
-            sql = f"SHOW TABLES LIKE '{table_name}'"
-            result = self.query_to_dataframe(sql)
-            return not result.empty
+            sql = "SHOW TABLES LIKE :table_name"
+            result = self.query_to_dataframe(sql, {'table_name': table_name})
+            exists = not result.empty
         except Exception:
             return False
 
-    def query_to_dataframe(self, sql: str, params: Optional[Dict] = None) -> pd.DataFrame:
+        self._table_exists_cache[table_name] = (time.monotonic(), exists)
+        return exists
+
+    def filter_existing_tables(self, table_names: List[str]) -> set:
+        """一次查询检查多个表，返回其中已存在的表名集合，并写入表存在检查缓存"""
+        if not table_names:
+            return set()
+
+        placeholders = ', '.join(f':table_name_{i}' for i in range(len(table_names)))
+        result = self.query_to_dataframe(
+            "SELECT table_name FROM information_schema.tables "
+            f"WHERE table_schema = DATABASE() AND table_name IN ({placeholders})",
+            {f'table_name_{i}': name for i, name in enumerate(table_names)}
+        )
+        existing = set(result.iloc[:, 0]) if not result.empty else set()
+
+        now = time.monotonic()
+        for name in table_names:
+            self._table_exists_cache[name] = (now, name in existing)
+        return existing
+
+    def query_to_dataframe(self, sql: Union[str, TextClause], params: Optional[Dict] = None) -> pd.DataFrame:
         """查询数据并返回DataFrame"""
         try:
+            # 已构造好的text语句直接复用
+            stmt = sql if isinstance(sql, TextClause) else text(sql)
             with self.engine.connect() as conn:
                 if params:
-                    df = pd.read_sql(text(sql), conn, params=params)
+                    df = pd.read_sql(stmt, conn, params=params)
                 else:
-                    df = pd.read_sql(text(sql), conn)
+                    df = pd.read_sql(stmt, conn)
 
                 return df
 
@@ -475,8 +618,23 @@ class EnhancedDatabaseManager:
             logger.error(f"查询数据失败: {e}")
             return pd.DataFrame()
 
-    def safe_query_to_dataframe(self, sql: str, params: Optional[Dict] = None, required_tables: List[str] = None) -> pd.DataFrame:
-        """安全查询数据，检查表是否存在"""
+    def query_to_dataframe_chunked(self, sql: Union[str, TextClause], params: Optional[Dict] = None,
+                                   chunksize: int = 50000) -> pd.DataFrame:
+        """经服务端游标（stream_results）分块读取查询结果后拼接，驱动不必先把全部结果缓存为Python元组，适合大结果集"""
+        try:
+            stmt = sql if isinstance(sql, TextClause) else text(sql)
+            with self.engine.connect().execution_options(stream_results=True) as conn:
+                chunks = list(pd.read_sql(stmt, conn, params=params, chunksize=chunksize))
+
+            return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+        except Exception as e:
+            logger.error(f"分块查询数据失败: {e}")
+            return pd.DataFrame()
+
+    def safe_query_to_dataframe(self, sql: Union[str, TextClause], params: Optional[Dict] = None, required_tables: List[str] = None,
+                                stream: bool = False) -> pd.DataFrame:
+        """安全查询数据，检查表是否存在；stream为True时经服务端游标分块读取"""
         try:
             # 检查必需的表是否存在
             if required_tables:
@@ -485,6 +643,8 @@ class EnhancedDatabaseManager:
                         logger.warning(f"表 {table} 不存在，跳过查询")
                         return pd.DataFrame()
 
+            if stream:
+                return self.query_to_dataframe_chunked(sql, params)
             return self.query_to_dataframe(sql, params)
         except Exception as e:
             logger.error(f"安全查询数据失败: {e}")
@@ -494,7 +654,7 @@ class EnhancedDatabaseManager:
                          df: pd.DataFrame,
                          table_name: str,
                          unique_columns: List[str],
-                         batch_size: int = 1000) -> bool:
+                         batch_size: int = 5000) -> bool:
         """
         批量更新插入数据（如果存在则更新，不存在则插入）
 
@@ -508,37 +668,7 @@ class EnhancedDatabaseManager:
             if df.empty:
                 return True
 
-            # 生成UPSERT SQL
-            columns = list(df.columns)
-            placeholders = ', '.join([f':{col}' for col in columns])
-
-            # 构建ON DUPLICATE KEY UPDATE子句
-            update_clause = ', '.join([
-                f'{col} = VALUES({col})' for col in columns
-                if col not in unique_columns and col not in ['id', 'created_at']
-            ])
-
-            sql = f"""
-            INSERT INTO {table_name} ({', '.join(columns)})
-            VALUES ({placeholders})
-            ON DUPLICATE KEY UPDATE {update_clause}
-            """
-
-            # 分批执行
-            total_rows = len(df)
-            processed_rows = 0
-
-            with self.engine.connect() as conn:
-                with conn.begin():
-                    for i in range(0, total_rows, batch_size):
-                        batch_df = df.iloc[i:i + batch_size]
-                        batch_data = batch_df.to_dict('records')
-
-                        conn.execute(text(sql), batch_data)
-                        processed_rows += len(batch_df)
-
-                        if total_rows > batch_size:
-                            logger.info(f"已处理 {processed_rows}/{total_rows} 行 (UPSERT)")
+            processed_rows = upsert_dataframe(self.engine, df, table_name, unique_columns, batch_size)
 
             logger.info(f"UPSERT完成: {processed_rows} 行到表 {table_name}")
             return True
@@ -610,7 +740,7 @@ class EnhancedDatabaseManager:
                                      date_or_period: str,
                                      if_exists: str = 'append',
                                      batch_size: int = 1000,
-                                     method: str = 'multi') -> bool:
+                                     method: Optional[str] = None) -> bool:
         """
         批量插入数据到动态表中
 
@@ -0,0 +1,130 @@
+"""
+HTTP连接复用模块
+akshare内部通过requests.get/post逐次请求，每次都会新建TCP/TLS连接；
+安装后requests的模块级请求函数改用全局共享的Session，复用长连接。
+
+注意：替换的是进程内全部requests.get/post调用，不限于akshare。为避免不同站点、不同线程之间相互影响，
+共享Session不保存也不发送服务器设置的Cookie（调用方通过cookies参数显式传入的仍会发送），
+未指定timeout的请求使用REQUEST_TIMEOUT
+"""
+
+import random
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from http.cookiejar import DefaultCookiePolicy
+import requests
+import requests.api
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from loguru import logger
+
+# 数据获取在多个线程中并发执行，连接池需要容纳同时进行的请求
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 64
+
+# 未显式指定超时的请求使用的默认超时（秒），防止请求挂起长期占用取数线程池
+REQUEST_TIMEOUT = 30
+
+# 值得重试的临时性错误：超时与网络错误；HTTP 4xx、JSON解析失败、空数据等确定性结果重试无益，
+# 因此不使用覆盖这些情况的requests.exceptions.RequestException
+RETRY_ON = (TimeoutError, ConnectionError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+# 带超时的取数调用共用的线程池大小，不小于各调用方的最大并发数（data_fetch.max_workers、ANOMALY_WORKERS等）
+FETCH_WORKERS = 16
+
+# 重试间隔上限（秒）
+MAX_BACKOFF = 8
+
+# 连接的socket选项：urllib3默认的TCP_NODELAY之外开启TCP keepalive，
+# 连接池中长时间空闲的连接被中间网络设备断开时能够被及时发现
+SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+_session = None
+
+# 进程内唯一的取数线程池，BasicData与DataFetcher共用
+FETCH_THREAD_PREFIX = "akshare"
+_fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix=FETCH_THREAD_PREFIX)
+
+
+class NoCookiePolicy(DefaultCookiePolicy):
+    """拒绝保存和发送任何Cookie的策略，共享Session的Cookie jar始终为空"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """为连接池中的连接设置SOCKET_OPTIONS的HTTPAdapter"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+def get_session():
+    """获取全局共享的Session（urllib3连接池线程安全）"""
+    global _session
+
+    if _session is None:
+        session = requests.Session()
+        session.cookies.set_policy(NoCookiePolicy())
+        adapter = KeepAliveAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+
+    return _session
+
+
+def _session_request(method, url, **kwargs):
+    """替代requests.api.request，通过共享Session发起请求"""
+    kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+    return get_session().request(method=method, url=url, **kwargs)
+
+
+def install_shared_session():
+    """让requests.get/post等模块级函数复用共享Session，重复调用无副作用
+
+    全局生效：进程内所有经requests.get/post发起的请求都会改走共享Session（见模块说明）
+    """
+    if requests.api.request is not _session_request:
+        get_session()  # 在导入时创建，避免多个线程同时创建
+        requests.api.request = _session_request
+        logger.info("已启用HTTP连接复用")
+
+
+def run_with_timeout(func, timeout, *args, **kwargs):
+    """在共享取数线程池中执行func，超过timeout秒未返回时抛出TimeoutError
+
+    超时从任务开始执行时计算；线程池繁忙时最多排队等待timeout秒，仍未开始执行时取消任务并抛出TimeoutError。
+    已在取数线程池中的调用直接在当前线程执行，避免嵌套提交占满线程池后相互等待
+    """
+    if threading.current_thread().name.startswith(FETCH_THREAD_PREFIX):
+        return func(*args, **kwargs)
+
+    started = threading.Event()
+
+    def task():
+        started.set()
+        return func(*args, **kwargs)
+
+    future = _fetch_executor.submit(task)
+    if not started.wait(timeout) and future.cancel():
+        logger.warning(f"函数 {func.__name__} 排队等待超时 ({timeout}秒)，取数线程池已满")
+        raise TimeoutError(f"等待取数线程超时: {timeout}秒")
+
+    try:
+        return future.result(timeout=timeout)
+    except FuturesTimeoutError:
+        # 已在执行的请求无法中断，结束后线程归还线程池
+        logger.warning(f"函数 {func.__name__} 执行超时 ({timeout}秒)")
+        raise TimeoutError(f"函数执行超时: {timeout}秒")
+
+
+def backoff_delay(attempt):
+    """第attempt次（从0开始）失败后的重试等待时间：指数退避并加入随机抖动，避免并发线程同时重试"""
+    return min(MAX_BACKOFF, 2 ** attempt) * (0.5 + random.random())
@@ -268,7 +268,8 @@ class TickData:
             # 选择需要的列
             columns = ['stock_code', 'trade_time', 'price', 'price_change', 'volume', 'amount', 'trade_type',
                        'trade_date']
-            db_data = tick_data[columns].copy()
+            # 选列已返回新的DataFrame，后续只按日期分组读取，无需再复制
+            db_data = tick_data[columns]
 
             # 按交易日期分组保存到不同的表
             for trade_date, group_data in db_data.groupby('trade_date'):
@@ -287,42 +288,8 @@ class TickData:
     def get_tick_data_from_db(self, stock_code, start_date=None, end_date=None):
         """从数据库获取分笔数据（从按日期分表中查询）"""
         try:
-            from datetime import datetime, timedelta
-
-            # 确定查询的日期范围
-            if start_date is None:
-                start_date = datetime.now().date()
-            elif isinstance(start_date, str):
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-
-            if end_date is None:
-                end_date = start_date
-            elif isinstance(end_date, str):
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-
-            all_data = []
-            current_date = start_date
-
-            # 遍历日期范围，从各个分表中查询数据
-            while current_date <= end_date:
-                table_name = db_manager.get_tick_table_name(current_date)
-
-                # 检查表是否存在
-                check_sql = f"""
-                SELECT COUNT(*) as count FROM information_schema.tables
-                WHERE table_schema = DATABASE() AND table_name = '{table_name}'
-                """
-                table_exists = db_manager.query_to_dataframe(check_sql)
-
-                if not table_exists.empty and table_exists.iloc[0]['count'] > 0:
-                    sql = f"SELECT * FROM {table_name} WHERE stock_code = :stock_code ORDER BY trade_time"
-                    params = {'stock_code': stock_code}
-
-                    daily_data = db_manager.query_to_dataframe(sql, params)
-                    if not daily_data.empty:
-                        all_data.append(daily_data)
-
-                current_date += timedelta(days=1)
+            all_data = [chunk for chunk in self.iter_tick_data_from_db(stock_code, start_date, end_date)
+                        if not chunk.empty]
 
             # 合并所有数据
             if all_data:
@@ -338,6 +305,37 @@ class TickData:
             logger.error(f"从数据库获取分笔数据失败: {e}")
             return pd.DataFrame()
 
+    def iter_tick_data_from_db(self, stock_code, start_date=None, end_date=None, chunksize=None):
+        """按日期分表依次读取分笔数据，指定chunksize时每张表再按块流式读取"""
+        # 确定查询的日期范围
+        if start_date is None:
+            start_date = datetime.now().date()
+        elif isinstance(start_date, str):
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+
+        if end_date is None:
+            end_date = start_date
+        elif isinstance(end_date, str):
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+
+        current_date = start_date
+
+        # 遍历日期范围，从各个分表中查询数据
+        while current_date <= end_date:
+            table_name = db_manager.get_tick_table_name(current_date)
+
+            # 检查表是否存在
+            if db_manager.table_exists(table_name):
+                sql = f"SELECT * FROM {table_name} WHERE stock_code = :stock_code ORDER BY trade_time"
+                params = {'stock_code': stock_code}
+
+                if chunksize:
+                    yield from db_manager.query_to_dataframe(sql, params, chunksize=chunksize)
+                else:
+                    yield db_manager.query_to_dataframe(sql, params)
+
+            current_date += timedelta(days=1)
+
     def download_and_save_tick_data(self, stock_code, trade_date=None, save_excel=True, save_db=True):
         """下载并保存分笔数据"""
         try:
@@ -422,6 +420,6 @@ try:
     timeout = config.get_data_fetch_timeout()
     max_retries = config.get_max_retries()
     tick_data = TickData(timeout=timeout, max_retries=max_retries)
-except:
+except Exception:
     # 如果配置读取失败，使用默认值
     tick_data = TickData(timeout=10, max_retries=3)
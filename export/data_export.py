@@ -366,48 +366,44 @@ class DataExporter:
     def export_statistical_report(self, stock_codes=None, period='daily', format='excel'):
         """导出统计报告"""
         try:
-            # 获取股票列表
-            if stock_codes is None:
-                stock_list_df = db_manager.query_to_dataframe(
-                    "SELECT DISTINCT stock_code FROM basic_data WHERE period_type = :period", {'period': period})
-                stock_codes = stock_list_df['stock_code'].tolist()[:50]  # 限制为前50只股票
+            # 所有股票的统计信息由一条分组聚合查询完成，避免逐只股票往返数据库
+            sql = """
+            SELECT
+                stock_code,
+                COUNT(*) as total_records,
+                MIN(trade_date) as start_date,
+                MAX(trade_date) as end_date,
+                AVG(close_price) as avg_price,
+                MAX(high_price) as max_price,
+                MIN(low_price) as min_price,
+                SUM(volume) as total_volume,
+                SUM(amount) as total_amount,
+                AVG(change_pct) as avg_change_pct,
+                STDDEV(change_pct) as volatility,
+                SUM(CASE WHEN change_pct > 0 THEN 1 ELSE 0 END) as up_days,
+                SUM(CASE WHEN change_pct < 0 THEN 1 ELSE 0 END) as down_days
+            FROM basic_data
+            WHERE period_type = :period
+            """
+            params = {'period': period}
 
-            reports = []
+            if stock_codes is not None:
+                if not stock_codes:
+                    logger.warning("没有统计数据可导出")
+                    return None
+                placeholders = ','.join([f':stock_code_{i}' for i in range(len(stock_codes))])
+                sql += f" AND stock_code IN ({placeholders})"
+                for i, stock_code in enumerate(stock_codes):
+                    params[f'stock_code_{i}'] = stock_code
 
-            for stock_code in stock_codes:
-                try:
-                    # 获取基础统计信息
-                    sql = """
-                    SELECT
-                        stock_code,
-                        COUNT(*) as total_records,
-                        MIN(trade_date) as start_date,
-                        MAX(trade_date) as end_date,
-                        AVG(close_price) as avg_price,
-                        MAX(high_price) as max_price,
-                        MIN(low_price) as min_price,
-                        SUM(volume) as total_volume,
-                        SUM(amount) as total_amount,
-                        AVG(change_pct) as avg_change_pct,
-                        STDDEV(change_pct) as volatility
-                    FROM basic_data
-                    WHERE stock_code = :stock_code AND period_type = :period
-                    GROUP BY stock_code
-                    """
-
-                    params = {'stock_code': stock_code, 'period': period}
-                    stats_df = db_manager.query_to_dataframe(sql, params)
-
-                    if not stats_df.empty:
-                        reports.append(stats_df.iloc[0])
+            sql += " GROUP BY stock_code ORDER BY stock_code"
 
-                except Exception as e:
-                    logger.error(f"生成股票 {stock_code} 统计报告失败: {e}")
-                    continue
+            if stock_codes is None:
+                sql += " LIMIT 50"  # 限制为前50只股票
 
-            if reports:
-                report_df = pd.DataFrame(reports)
+            report_df = db_manager.query_to_dataframe(sql, params)
 
+            if not report_df.empty:
                 # 添加股票名称
                 stock_names = {}
                 for code in report_df['stock_code']:
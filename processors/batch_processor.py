@@ -16,6 +16,7 @@ from loguru import logger
 from tqdm import tqdm
 import json
 from typing import List, Dict, Optional, Union
+from core.config import config
 from data.database import db_manager
 import utils.stock_info as stock_info_module
 # 使用时
@@ -28,8 +29,8 @@ import schedule
 class BatchProcessor:
     """批量数据处理器"""
 
-    def __init__(self, max_workers=10, retry_times=3, batch_size=50):
-        self.max_workers = max_workers
+    def __init__(self, max_workers=None, retry_times=3, batch_size=50):
+        self.max_workers = max_workers or config.get_max_workers()  # 默认取配置 data_fetch.max_workers
         self.retry_times = retry_times
         self.batch_size = batch_size
         self.failed_tasks = []
@@ -349,33 +350,44 @@ class BatchProcessor:
 
         results = {'success': 0, 'failed': 0, 'errors': [], 'periods': periods}
 
-        # 对每个周期分别处理
-        for period in periods:
-            logger.info(f"正在处理周期: {period}")
-
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                with tqdm(total=len(stock_list), desc=f"下载{period}数据") as pbar:
-                    future_to_stock = {
-                        executor.submit(self._download_single_basic_data, stock['stock_code'], period, start_date): stock
-                        for stock in stock_list
-                    }
-
-                    for future in concurrent.futures.as_completed(future_to_stock):
-                        stock = future_to_stock[future]
-                        try:
-                            success = future.result()
-                            if success:
-                                results['success'] += 1
-                            else:
-                                results['failed'] += 1
-                                results['errors'].append(f"股票 {stock['stock_code']} {period} 数据下载失败")
-                        except Exception as e:
+        # 每批股票的所有 (股票, 周期) 任务由update_many并发获取，获取完成后每个周期只入库一次
+        with tqdm(total=len(stock_list) * len(periods), desc="下载基础数据") as pbar:
+            for i in range(0, len(stock_list), self.batch_size):
+                stock_codes = [stock['stock_code'] for stock in stock_list[i:i + self.batch_size]]
+
+                errors = {}
+                updated = basic_data.update_many(stock_codes, periods, start_date=start_date,
+                                                 max_workers=self.max_workers, errors=errors)
+
+                # 获取出错的 (股票, 周期) 按周期分组重新获取，最多共尝试retry_times次
+                for attempt in range(1, self.retry_times):
+                    if not errors:
+                        break
+                    time.sleep(1)
+
+                    retry_codes = {}
+                    for stock_code, period in errors:
+                        retry_codes.setdefault(period, []).append(stock_code)
+
+                    errors = {}
+                    for period, codes in retry_codes.items():
+                        logger.info(f"第{attempt + 1}次尝试下载 {len(codes)} 只股票的 {period} 周期数据")
+                        retried = basic_data.update_many(codes, [period], start_date=start_date,
+                                                         max_workers=self.max_workers, errors=errors)
+                        for stock_code, data in retried.items():
+                            updated.setdefault(stock_code, {}).update(data)
+
+                for stock_code in stock_codes:
+                    for period in periods:
+                        if period in updated.get(stock_code, {}):
+                            results['success'] += 1
+                        else:
                             results['failed'] += 1
-                            error_msg = f"股票 {stock['stock_code']} {period} 数据下载异常: {str(e)}"
-                            results['errors'].append(error_msg)
-                            logger.error(error_msg)
+                            error = errors.get((stock_code, period))
+                            results['errors'].append(f"股票 {stock_code} {period} 数据下载失败"
+                                                     + (f": {error}" if error else ""))
 
-                        pbar.update(1)
+                pbar.update(len(stock_codes) * len(periods))
 
         logger.info(f"基础数据下载完成: 成功 {results['success']}, 失败 {results['failed']}")
 
@@ -384,32 +396,6 @@ class BatchProcessor:
 
         return results
 
-    def _download_single_basic_data(self, stock_code: str, period: str, start_date: Optional[str] = None) -> bool:
-        """下载单个股票的基础数据"""
-        try:
-            # 重试机制
-            for attempt in range(self.retry_times):
-                try:
-                    result = basic_data.update_basic_data(stock_code, [period], start_date=start_date)
-                    if result and period in result:
-                        return True
-
-                    if attempt < self.retry_times - 1:
-                        time.sleep(1)
-
-                except Exception as e:
-                    if attempt < self.retry_times - 1:
-                        time.sleep(1)
-                        continue
-                    else:
-                        raise e
-
-            return False
-
-        except Exception as e:
-            logger.error(f"下载股票 {stock_code} {period} 基础数据失败: {e}")
-            return False
-
     def _save_batch_report(self, task_type: str, results: Dict):
         """保存批量处理报告"""
         try:
@@ -12,6 +12,7 @@ from datetime import datetime
 from loguru import logger
 from data.database import db_manager
 from core.config import config
+from core.cache import invalidate
 
 
 class IndicatorProcessor:
@@ -91,6 +92,9 @@ class IndicatorProcessor:
                             db_manager.execute_sql(sql, params)
 
             logger.info(f"保存指标数据成功: {stock_code}")
+
+            # /api/indicator/get 的缓存响应已过期
+            invalidate(f"/api/indicator/get/{stock_code}/")
         except Exception as e:
             logger.error(f"保存指标数据失败: {e}")
 
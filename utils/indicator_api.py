@@ -5,11 +5,14 @@
 提供技术指标相关的API接口
 """
 
+import pandas as pd
 from flask import Blueprint, request, jsonify
 from datetime import datetime, date
 from loguru import logger
 from processors.indicator_processor import indicator_processor
 from data.database import db_manager
+from core.cache import cached
+from core.response import df_response
 
 indicator_api = Blueprint('indicator_api', __name__, url_prefix='/api/indicator')
 
@@ -45,14 +48,14 @@ def calculate_indicators(stock_code):
             result_data = indicator_processor.calculate_kdj(result_data)
 
         # 转换为JSON格式
-        result_data['trade_date'] = result_data['trade_date'].astype(str)
+        result_data['trade_date'] = pd.to_datetime(result_data['trade_date']).dt.strftime('%Y-%m-%d')
 
-        return jsonify({
-            'stock_code': stock_code,
-            'period': period,
-            'indicators': indicators,
-            'data': result_data.to_dict('records')
-        })
+        return df_response(
+            result_data,
+            stock_code=stock_code,
+            period=period,
+            indicators=indicators
+        )
 
     except Exception as e:
         logger.error(f"计算指标失败: {e}")
@@ -60,6 +63,7 @@ def calculate_indicators(stock_code):
 
 
 @indicator_api.route('/get/<string:stock_code>/<string:indicator_name>', methods=['GET'])
+@cached(ttl=600)
 def get_indicator_data(stock_code, indicator_name):
     """获取指标数据"""
     try:
@@ -93,14 +97,14 @@ def get_indicator_data(stock_code, indicator_name):
             return jsonify({'error': '无指标数据'}), 404
 
         # 转换为JSON格式
-        indicator_data['trade_date'] = indicator_data['trade_date'].astype(str)
-
-        return jsonify({
-            'stock_code': stock_code,
-            'indicator_name': indicator_name,
-            'period': period,
-            'data': indicator_data.to_dict('records')
-        })
+        indicator_data['trade_date'] = pd.to_datetime(indicator_data['trade_date']).dt.strftime('%Y-%m-%d')
+
+        return df_response(
+            indicator_data,
+            stock_code=stock_code,
+            indicator_name=indicator_name,
+            period=period
+        )
 
     except Exception as e:
         logger.error(f"获取指标数据失败: {e}")
@@ -46,6 +46,7 @@ class StockDataManager:
         # 运行状态
         self.is_running = False
         self.scheduler_thread = None
+        self._stop_event = threading.Event()  # 停止调度器时唤醒休眠中的调度线程
 
     def setup_logging(self):
         """设置日志配置"""
@@ -552,6 +553,7 @@ class StockDataManager:
         """启动定时任务调度器"""
         if not self.is_running:
             self.is_running = True
+            self._stop_event.clear()
             self.scheduler_thread = threading.Thread(target=self._run_scheduler, daemon=True)
             self.scheduler_thread.start()
             logger.info("定时任务调度器已启动")
@@ -559,6 +561,7 @@ class StockDataManager:
     def stop_scheduler(self):
         """停止定时任务调度器"""
         self.is_running = False
+        self._stop_event.set()
         schedule.clear()
         if self.scheduler_thread and self.scheduler_thread.is_alive():
             self.scheduler_thread.join(timeout=1)
@@ -567,8 +570,12 @@ class StockDataManager:
     def _run_scheduler(self):
         """运行定时任务调度器"""
         while self.is_running:
+            # 休眠到下一个任务的执行时间（最长1小时），停止调度器时立即返回
+            idle = schedule.idle_seconds()
+            idle = 3600 if idle is None else min(idle, 3600)
+            if idle > 0 and self._stop_event.wait(timeout=idle):
+                break
             schedule.run_pending()
-            time.sleep(60)  # 每分钟检查一次
 
     def _scheduled_basic_update(self):
         """定时基础数据更新"""
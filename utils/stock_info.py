@@ -15,6 +15,9 @@ except ImportError:
     from data.database import db_manager
 from core.config import config
 
+# stock_info 查询返回的列（不含自增主键和时间戳）
+STOCK_INFO_COLUMNS = "stock_code, stock_name, market, list_date, total_shares, float_shares, industry"
+
 
 class StockInfo:
     """股票信息管理类"""
@@ -154,10 +157,10 @@ class StockInfo:
     def get_stock_info_from_db(self, stock_code=None):
         """从数据库获取股票信息"""
         if stock_code:
-            sql = "SELECT * FROM stock_info WHERE stock_code = :stock_code"
+            sql = f"SELECT {STOCK_INFO_COLUMNS} FROM stock_info WHERE stock_code = :stock_code"
             params = {'stock_code': stock_code}
         else:
-            sql = "SELECT * FROM stock_info ORDER BY stock_code"
+            sql = f"SELECT {STOCK_INFO_COLUMNS} FROM stock_info ORDER BY stock_code"
             params = None
 
         return db_manager.query_to_dataframe(sql, params)
@@ -202,12 +205,11 @@ class StockInfo:
 
             if price is None:
                 # 获取最新价格
-                from data.basic_data import BasicData
-                basic_data = BasicData()
+                from data.basic_data import basic_data
                 latest_data = basic_data.get_latest_data(stock_code)
-                if latest_data.empty:
+                if latest_data is None:
                     return None
-                price = latest_data.iloc[0]['close_price']
+                price = latest_data['close_price']
 
             market_value = {
                 'total_market_value': total_shares * price if total_shares else None,
@@ -398,10 +400,10 @@ class StockInfo:
         """根据市场获取股票列表"""
         try:
             if market == 'all':
-                sql = "SELECT * FROM stock_info ORDER BY market, stock_code"
+                sql = f"SELECT {STOCK_INFO_COLUMNS} FROM stock_info ORDER BY market, stock_code"
                 params = None
             else:
-                sql = "SELECT * FROM stock_info WHERE market = :market ORDER BY stock_code"
+                sql = f"SELECT {STOCK_INFO_COLUMNS} FROM stock_info WHERE market = :market ORDER BY stock_code"
                 params = {'market': market}
 
             return db_manager.query_to_dataframe(sql, params)
@@ -413,7 +415,7 @@ class StockInfo:
     def get_stocks_by_industry(self, industry):
         """根据行业获取股票列表"""
         try:
-            sql = "SELECT * FROM stock_info WHERE industry = :industry ORDER BY stock_code"
+            sql = f"SELECT {STOCK_INFO_COLUMNS} FROM stock_info WHERE industry = :industry ORDER BY stock_code"
             params = {'industry': industry}
             return db_manager.query_to_dataframe(sql, params)
 
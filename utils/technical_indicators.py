@@ -20,8 +20,11 @@ class TechnicalAnalyzer:
             return data
 
         try:
-            data = data.copy()
-            data = data.sort_values('trade_date')
+            # 数据已按日期排序时（数据库查询均带ORDER BY）只复制，不再排序
+            if data['trade_date'].is_monotonic_increasing:
+                data = data.copy()
+            else:
+                data = data.sort_values('trade_date', kind='mergesort')
 
             # 移动平均线
             data = self._calculate_moving_averages(data)